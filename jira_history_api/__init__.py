@@ -11,13 +11,23 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from jira_history_api.jira_history import Jira
-from jira_history_api import cli
+import importlib
 
 __all__ = [
     'Jira'
 ]
 
 
+def __getattr__(name):
+    # Submodules, and thereby their dependencies, are only imported upon first use
+    if name == 'Jira':
+        return importlib.import_module('jira_history_api.jira_history').Jira
+
+    if name == 'cli':
+        return importlib.import_module('jira_history_api.cli')
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
 if __name__ == '__main__':
-    cli.main()
+    __getattr__('cli').main()
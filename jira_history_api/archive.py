@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact binary archive of fetched issues and their changelogs.
+
+Layout (little endian):
+
+    header     magic (4s), issue count (I), string count (I), string table offset (Q), index offset (Q)
+    records    per issue:
+                 length (varint) + JSON of the issue without its changelog
+                 history count (varint)
+                 per history: timestamp delta in seconds (zigzag varint, relative to the previous
+                              history), timestamp suffix, ID and author (string references),
+                              item count (varint) and per item a string reference for every
+                              key in `ITEM_KEYS`
+    strings    offsets (I, string count + 1) followed by the UTF-8 encoded strings
+    index      per issue: key (string reference, I) and record offset (Q)
+
+All changelog strings (field names, user names, status IDs, ...) are dictionary encoded: they are
+stored once in the string table and referenced by number. Reference 0 denotes an absent key,
+reference 1 denotes None. Issues are decoded on demand from a memory-mapped file.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+import json
+import mmap
+import struct
+
+from jira_history_api import utils
+
+MAGIC = b'JHA1'
+ITEM_KEYS = ('field', 'fieldtype', 'fieldId', 'from', 'fromString', 'to', 'toString')
+
+_HEADER = struct.Struct('<4sIIQQ')
+_OFFSET = struct.Struct('<I')
+_INDEX_ENTRY = struct.Struct('<IQ')
+_EPOCH = datetime(1970, 1, 1)
+_ABSENT = 0
+_NONE = 1
+
+
+class ArchiveError(ValueError):
+    """Raised when a file is not a (valid) archive"""
+
+
+def _write_varint(buffer: bytearray, value: int):
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: object, position: int) -> tuple:
+    result = 0
+    shift = 0
+    while True:
+        _byte = data[position]
+        position += 1
+        result |= (_byte & 0x7f) << shift
+        if not _byte & 0x80:
+            return result, position
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+class _StringTable():
+    def __init__(self: object):
+        self.strings = []
+        self._references = {}
+
+    def reference(self: object, value: object, present: bool = True) -> int:
+        if not present:
+            return _ABSENT
+        if value is None:
+            return _NONE
+
+        try:
+            return self._references[value]
+        except KeyError:
+            self.strings.append(value)
+            self._references[value] = len(self.strings) + 1
+
+        return self._references[value]
+
+
+def write_archive(path: str, issues: list) -> int:
+    """
+    Writes issues, including their changelog, to an archive
+    :param path: Path of the archive
+    :param issues: Issues (including changelog) as retrieved from Jira
+    :returns: Number of issues written
+    """
+    _strings = _StringTable()
+    _records = bytearray()
+    _index = []
+
+    for issue in issues:
+        _index.append((_strings.reference(issue['key']), _HEADER.size + len(_records)))
+
+        _issue = {key: value for key, value in issue.items() if key != 'changelog'}
+        _json = json.dumps(_issue, separators=(',', ':')).encode('utf-8')
+        _write_varint(_records, len(_json))
+        _records += _json
+
+        _histories = issue.get('changelog', {}).get('histories', [])
+        _write_varint(_records, len(_histories))
+
+        _previous = 0
+        for history in _histories:
+            _timestamp = calendar.timegm(utils.field_to_datetime(history['created']).timetuple())
+            _write_varint(_records, _zigzag(_timestamp - _previous))
+            _previous = _timestamp
+
+            _write_varint(_records, _strings.reference(history['created'][19:]))
+            _write_varint(_records, _strings.reference(history.get('id'), 'id' in history))
+            _author = json.dumps(history['author'], sort_keys=True, separators=(',', ':')) if 'author' in history else None
+            _write_varint(_records, _strings.reference(_author, 'author' in history))
+
+            _write_varint(_records, len(history['items']))
+            for item in history['items']:
+                for key in ITEM_KEYS:
+                    _value = item.get(key)
+                    _write_varint(_records, _strings.reference(None if _value is None else str(_value), key in item))
+
+    _string_data = [value.encode('utf-8') for value in _strings.strings]
+    _string_offsets = [0]
+    for value in _string_data:
+        _string_offsets.append(_string_offsets[-1] + len(value))
+
+    _strings_offset = _HEADER.size + len(_records)
+    _index_offset = _strings_offset + _OFFSET.size * len(_string_offsets) + _string_offsets[-1]
+
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, len(_index), len(_string_data), _strings_offset, _index_offset))
+        file.write(_records)
+        file.write(b''.join(_OFFSET.pack(offset) for offset in _string_offsets))
+        file.write(b''.join(_string_data))
+        file.write(b''.join(_INDEX_ENTRY.pack(key, offset) for key, offset in _index))
+
+    return len(_index)
+
+
+class Archive():
+    """
+    Memory-mapped reader of an archive written by `write_archive`. Only the index is read
+    when opening the archive; issues and strings are decoded on demand.
+    """
+
+    def __init__(self: object, path: str):
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ArchiveError(f'Empty archive: {path}')
+
+        if len(self._data) < _HEADER.size or self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ArchiveError(f'Not an archive: {path}')
+
+        _, self._count, self._string_count, self._strings_offset, _index_offset = _HEADER.unpack_from(self._data, 0)
+
+        self._blob_offset = self._strings_offset + _OFFSET.size * (self._string_count + 1)
+        self._strings = {}
+
+        self._index = {}
+        for number in range(self._count):
+            _key, _offset = _INDEX_ENTRY.unpack_from(self._data, _index_offset + number * _INDEX_ENTRY.size)
+            self._index[self._string(_key)] = _offset
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self: object, *_args):
+        self.close()
+
+    def __len__(self: object) -> int:
+        return self._count
+
+    def __contains__(self: object, key: str) -> bool:
+        return key in self._index
+
+    def keys(self: object) -> list:
+        """Lists the keys of all archived issues, in archive order"""
+        return list(self._index)
+
+    def close(self: object):
+        self._data.close()
+        self._file.close()
+
+    def _string(self: object, reference: int) -> str:
+        if reference == _NONE:
+            return None
+
+        try:
+            return self._strings[reference]
+        except KeyError:
+            _position = self._strings_offset + _OFFSET.size * (reference - 2)
+            _start, _end = struct.unpack_from('<II', self._data, _position)
+            self._strings[reference] = self._data[self._blob_offset + _start:self._blob_offset + _end].decode('utf-8')
+
+        return self._strings[reference]
+
+    def get_issue(self: object, key: str) -> dict:
+        """
+        Decodes a single issue
+        :param key: Issue key
+        :returns: Issue, including changelog, as retrieved from Jira
+        """
+        _position = self._index[key]
+
+        _length, _position = _read_varint(self._data, _position)
+        issue = json.loads(self._data[_position:_position + _length].decode('utf-8'))
+        _position += _length
+
+        _histories = []
+        _count, _position = _read_varint(self._data, _position)
+        _timestamp = 0
+        for _ in range(_count):
+            _delta, _position = _read_varint(self._data, _position)
+            _timestamp += _unzigzag(_delta)
+
+            _suffix, _position = _read_varint(self._data, _position)
+            history = {'created': utils.datetime_to_field(_EPOCH + timedelta(seconds=_timestamp)) + self._string(_suffix)}
+
+            for name, decode in (('id', self._string), ('author', lambda reference: json.loads(self._string(reference)))):
+                _reference, _position = _read_varint(self._data, _position)
+                if _reference != _ABSENT:
+                    history[name] = None if _reference == _NONE else decode(_reference)
+
+            history['items'] = []
+            _items, _position = _read_varint(self._data, _position)
+            for _ in range(_items):
+                item = {}
+                for name in ITEM_KEYS:
+                    _reference, _position = _read_varint(self._data, _position)
+                    if _reference != _ABSENT:
+                        item[name] = self._string(_reference)
+                history['items'].append(item)
+
+            _histories.append(history)
+
+        issue['changelog'] = {'histories': _histories}
+        return issue
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Cache backends shared by multiple `Jira` instances, possibly in different processes or on
+different hosts. A backend stores string values by string key and provides (expiring) locks,
+which are used to retrieve every entry only once across all instances sharing the backend:
+
+- `LocalBackend`: in-process dictionary, shared by the instances of a single process
+- `SQLiteBackend`: SQLite database file, shared by the processes of a single host
+- `RedisBackend`: Redis (or a Redis protocol compatible server), shared by a fleet of hosts
+
+`BackendCache` exposes a namespace of a backend as a mutable mapping of JSON serializable values.
+"""
+
+import abc
+from collections.abc import MutableMapping
+import contextlib
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from jira_history_api import utils
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+class Backend(abc.ABC):
+    """
+    Interface of a cache backend. Entries expire `ttl` seconds after being stored, if set.
+    """
+
+    # Seconds between attempts to acquire a lock held by another instance
+    POLL_INTERVAL = 0.05
+
+    def __init__(self: object, ttl: float = None):
+        """
+        :param ttl: Number of seconds an entry remains valid, forever when None (optional)
+        """
+        self.ttl = ttl
+
+    @abc.abstractmethod
+    def get(self: object, key: str) -> str:
+        """
+        :returns: Value stored for the key or None when absent (or expired)
+        """
+
+    @abc.abstractmethod
+    def set(self: object, key: str, value: str):
+        """
+        Stores the value for the key, expiring after `ttl` seconds if set
+        """
+
+    @abc.abstractmethod
+    def delete(self: object, key: str) -> bool:
+        """
+        :returns: True when the key was present
+        """
+
+    @abc.abstractmethod
+    def keys(self: object, prefix: str) -> list:
+        """
+        :returns: All (unexpired) keys starting with the prefix
+        """
+
+    @abc.abstractmethod
+    def acquire(self: object, name: str, token: str, timeout: float) -> bool:
+        """
+        Acquires a lock unless it is held, which is released automatically after `timeout` seconds
+        :returns: True when the lock has been acquired
+        """
+
+    @abc.abstractmethod
+    def release(self: object, name: str, token: str):
+        """
+        Releases a lock, if still held using the given token
+        """
+
+    @contextlib.contextmanager
+    def lock(self: object, name: str, timeout: float = 60):
+        """
+        Holds a lock for the duration of the context, waiting for other holders to release it.
+        The lock is released automatically after `timeout` seconds, should its holder die.
+        :param name: Name of the lock
+        :param timeout: Maximum number of seconds the lock is held (optional)
+        """
+        _token = uuid.uuid4().hex
+        while not self.acquire(name, _token, timeout):
+            time.sleep(self.POLL_INTERVAL)
+
+        try:
+            yield
+        finally:
+            self.release(name, _token)
+
+
+class LocalBackend(Backend):
+    """
+    Backend storing its entries in a dictionary
+    """
+
+    def __init__(self: object, ttl: float = None):
+        super().__init__(ttl)
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _expiry(self: object) -> float:
+        return None if self.ttl is None else time.monotonic() + self.ttl
+
+    def get(self: object, key: str) -> str:
+        _value, _expiry = self._entries.get(key, (None, None))
+        if _expiry is not None and _expiry <= time.monotonic():
+            return None
+
+        return _value
+
+    def set(self: object, key: str, value: str):
+        self._entries[key] = (value, self._expiry())
+
+    def delete(self: object, key: str) -> bool:
+        return self._entries.pop(key, None) is not None
+
+    def keys(self: object, prefix: str) -> list:
+        return [key for key in list(self._entries) if key.startswith(prefix) and self.get(key) is not None]
+
+    def acquire(self: object, name: str, token: str, timeout: float) -> bool:
+        with self._lock:
+            _holder = self._locks.get(name)
+            if _holder is not None and _holder[1] > time.monotonic():
+                return False
+
+            self._locks[name] = (token, time.monotonic() + timeout)
+            return True
+
+    def release(self: object, name: str, token: str):
+        with self._lock:
+            if self._locks.get(name, (None,))[0] == token:
+                del self._locks[name]
+
+
+class SQLiteBackend(Backend):
+    """
+    Backend storing its entries in an SQLite database file
+    """
+
+    def __init__(self: object, path: str, ttl: float = None, timeout: float = 30):
+        """
+        :param path: Path of the database file; created when missing
+        :param ttl: Number of seconds an entry remains valid, forever when None (optional)
+        :param timeout: Number of seconds to wait for other processes writing to the database (optional)
+        """
+        super().__init__(ttl)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, expiry REAL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, token TEXT NOT NULL, expiry REAL NOT NULL)')
+
+    def get(self: object, key: str) -> str:
+        with self._lock:
+            _row = self._connection.execute('SELECT value FROM entries WHERE key = ? AND (expiry IS NULL OR expiry > ?)',
+                                            (key, time.time())).fetchone()
+
+        return _row[0] if _row else None
+
+    def set(self: object, key: str, value: str):
+        _expiry = None if self.ttl is None else time.time() + self.ttl
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO entries (key, value, expiry) VALUES (?, ?, ?)', (key, value, _expiry))
+
+    def delete(self: object, key: str) -> bool:
+        with self._lock:
+            return self._connection.execute('DELETE FROM entries WHERE key = ?', (key,)).rowcount > 0
+
+    def keys(self: object, prefix: str) -> list:
+        with self._lock:
+            _rows = self._connection.execute('SELECT key FROM entries WHERE substr(key, 1, ?) = ? AND (expiry IS NULL OR expiry > ?)',
+                                             (len(prefix), prefix, time.time())).fetchall()
+
+        return [row[0] for row in _rows]
+
+    def acquire(self: object, name: str, token: str, timeout: float) -> bool:
+        _now = time.time()
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                self._connection.execute('DELETE FROM locks WHERE name = ? AND expiry <= ?', (name, _now))
+                _acquired = self._connection.execute('INSERT OR IGNORE INTO locks (name, token, expiry) VALUES (?, ?, ?)',
+                                                     (name, token, _now + timeout)).rowcount > 0
+            finally:
+                self._connection.execute('COMMIT')
+
+        return _acquired
+
+    def release(self: object, name: str, token: str):
+        with self._lock:
+            self._connection.execute('DELETE FROM locks WHERE name = ? AND token = ?', (name, token))
+
+
+class RedisBackend(Backend):
+    """
+    Backend storing its entries in Redis, or any server speaking the Redis protocol (RESP).
+    Only the GET, SET (including the NX and PX options), DEL, SCAN, AUTH and SELECT commands are used.
+    """
+
+    def __init__(self: object, host: str = 'localhost', port: int = 6379, db: int = 0, password: str = None,
+                 ttl: float = None, timeout: float = 10):
+        """
+        :param host: Host name of the server (optional)
+        :param port: Port of the server (optional)
+        :param db: Database number (optional)
+        :param password: Password to authenticate with (optional)
+        :param ttl: Number of seconds an entry remains valid, forever when None (optional)
+        :param timeout: Number of seconds to wait for the server (optional)
+        """
+        super().__init__(ttl)
+        self._address = (host, port)
+        self._db = db
+        self._password = password
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._socket = None
+        self._reader = None
+
+    def _connect(self: object):
+        self._socket = socket.create_connection(self._address, timeout=self._timeout)
+        self._reader = self._socket.makefile('rb')
+
+        if self._password is not None:
+            self._call('AUTH', self._password)
+        if self._db:
+            self._call('SELECT', self._db)
+
+    def _close(self: object):
+        for _resource in (self._reader, self._socket):
+            if _resource is not None:
+                _resource.close()
+        self._socket = self._reader = None
+
+    def _read(self: object) -> object:
+        _line = self._reader.readline()
+        if not _line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by server')
+
+        _type, _data = _line[:1], _line[1:-2]
+        if _type == b'+':
+            return _data.decode('utf-8')
+        if _type == b'-':
+            raise BackendError(_data.decode('utf-8'))
+        if _type == b':':
+            return int(_data)
+        if _type == b'$':
+            if int(_data) < 0:
+                return None
+            _value = self._reader.read(int(_data) + 2)
+            return _value[:-2].decode('utf-8')
+        if _type == b'*':
+            if int(_data) < 0:
+                return None
+            return [self._read() for _ in range(int(_data))]
+
+        raise BackendError(f'Unexpected reply from server: {_line!r}')
+
+    def _call(self: object, *args) -> object:
+        _request = [b'*%d\r\n' % len(args)]
+        for argument in args:
+            _argument = str(argument).encode('utf-8')
+            _request.append(b'$%d\r\n%s\r\n' % (len(_argument), _argument))
+
+        self._socket.sendall(b''.join(_request))
+        return self._read()
+
+    def command(self: object, *args) -> object:
+        """
+        Sends a command to the server, (re)connecting when needed
+        :param args: Command and its arguments
+        :returns: Reply of the server
+        """
+        with self._lock:
+            if self._socket is None:
+                self._connect()
+
+            try:
+                return self._call(*args)
+            except (ConnectionError, socket.timeout):
+                self._close()
+                raise
+
+    def get(self: object, key: str) -> str:
+        return self.command('GET', key)
+
+    def set(self: object, key: str, value: str):
+        if self.ttl is None:
+            self.command('SET', key, value)
+        else:
+            self.command('SET', key, value, 'PX', int(self.ttl * 1000))
+
+    def delete(self: object, key: str) -> bool:
+        return self.command('DEL', key) > 0
+
+    def keys(self: object, prefix: str) -> list:
+        _pattern = ''.join('\\' + character if character in '*?[]\\' else character for character in prefix) + '*'
+
+        result = []
+        _cursor = '0'
+        while True:
+            _cursor, _keys = self.command('SCAN', _cursor, 'MATCH', _pattern, 'COUNT', 1000)
+            result.extend(_keys)
+            if _cursor == '0':
+                return sorted(set(result))
+
+    def acquire(self: object, name: str, token: str, timeout: float) -> bool:
+        return self.command('SET', name, token, 'NX', 'PX', int(timeout * 1000)) is not None
+
+    def release(self: object, name: str, token: str):
+        # Not atomic, but only releases a lock that expired at the very same moment;
+        # avoids relying on server-side scripting
+        if self.command('GET', name) == token:
+            self.command('DEL', name)
+
+
+class BackendCache(MutableMapping):
+    """
+    Dictionary of JSON serializable values stored in a namespace of a backend. Keys are strings
+    or (nested) tuples of strings. Lookups return a fresh copy of the stored value.
+
+    Optionally, recently used entries are also held by a local (in-process) mapping, which is consulted
+    before the backend. Entries changed by other users of the backend may then be served from the
+    local mapping until they expire from it.
+    """
+
+    def __init__(self: object, backend: Backend, namespace: str, local: MutableMapping = None):
+        """
+        :param backend: Backend storing the entries
+        :param namespace: Prefix of all keys stored in the backend
+        :param local: Mutable mapping holding recently used entries in-process, which should be bounded,
+                      e.g. `cache.Cache(maxsize=1000, ttl=300)` (optional)
+        """
+        self._backend = backend
+        self._prefix = namespace + ':'
+        self._local = local
+
+        self.hits = 0
+        self.misses = 0
+        self.local_hits = 0
+
+    def _key(self: object, key: object) -> str:
+        return self._prefix + json.dumps(key, separators=(',', ':'))
+
+    def _get(self: object, key: object) -> str:
+        """
+        Retrieves the serialized value of an entry, from the local mapping if present
+        :param key: Key of the entry
+        :returns: Serialized value, None when absent
+        """
+        _key = self._key(key)
+        if self._local is not None:
+            _value = self._local.get(_key)
+            if _value is not None:
+                self.local_hits += 1
+                return _value
+
+        _value = self._backend.get(_key)
+        if _value is not None and self._local is not None:
+            self._local[_key] = _value
+
+        return _value
+
+    def __getitem__(self: object, key: object) -> object:
+        _value = self._get(key)
+        if _value is None:
+            self.misses += 1
+            raise KeyError(key)
+
+        self.hits += 1
+        return json.loads(_value)
+
+    def __setitem__(self: object, key: object, value: object):
+        _value = json.dumps(value, separators=(',', ':'))
+        self._backend.set(self._key(key), _value)
+        if self._local is not None:
+            self._local[self._key(key)] = _value
+
+    def __delitem__(self: object, key: object):
+        if self._local is not None:
+            self._local.pop(self._key(key), None)
+        if not self._backend.delete(self._key(key)):
+            raise KeyError(key)
+
+    def __contains__(self: object, key: object) -> bool:
+        if self._local is not None and self._key(key) in self._local:
+            return True
+
+        return self._backend.get(self._key(key)) is not None
+
+    def __iter__(self: object):
+        for key in self._backend.keys(self._prefix):
+            yield utils.tuple_key(json.loads(key[len(self._prefix):]))
+
+    def __len__(self: object) -> int:
+        return len(self._backend.keys(self._prefix))
+
+    def lock(self: object, key: object, timeout: float = 60) -> object:
+        """
+        Lock shared by all users of the backend, to retrieve an entry only once
+        :param key: Key of the entry
+        :param timeout: Maximum number of seconds the lock is held (optional)
+        :returns: Context manager holding the lock
+        """
+        return self._backend.lock('lock:' + self._key(key), timeout)
+
+    def stats(self: object) -> dict:
+        """
+        Retrieves the statistics of this instance of the cache
+        :returns: Dictionary containing the hits (of which served by the local mapping), misses and hit rate
+        """
+        _lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'local_hits': self.local_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / _lookups if _lookups else 0.0
+        }
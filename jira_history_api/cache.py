@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable
+
+from jira_history_api import utils
+
+
+class Cache(MutableMapping):
+    """
+    Dictionary with an optional size bound (least recently used entries are evicted first)
+    and an optional time-to-live per entry. Lookups (`cache[key]` and `cache.get(key)`) are
+    accounted for in the hit/miss statistics; membership tests (`key in cache`) are not.
+
+    The cache is thread-safe. Without size bound and time-to-live, lookups do not take a lock;
+    the statistics are approximate in that case.
+    """
+
+    def __init__(self: object, maxsize: int = None, ttl: float = None, timer: Callable = time.monotonic):
+        """
+        :param maxsize: Maximum number of entries, unbounded when None (optional)
+        :param ttl: Number of seconds an entry remains valid, forever when None (optional)
+        :param timer: Callable returning the current time in seconds (optional)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self: object, expiry: float) -> bool:
+        return expiry is not None and expiry <= self._timer()
+
+    def __getitem__(self: object, key: object) -> object:
+        if self.maxsize is None and self.ttl is None:
+            try:
+                value = self._data[key][0]
+            except KeyError:
+                self.misses += 1
+                raise
+
+            self.hits += 1
+            return value
+
+        with self._lock:
+            try:
+                value, expiry = self._data[key]
+            except KeyError:
+                self.misses += 1
+                raise
+
+            if self._expired(expiry):
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                raise KeyError(key)
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self: object, key: object, value: object):
+        with self._lock:
+            self._data[key] = (value, None if self.ttl is None else self._timer() + self.ttl)
+            self._data.move_to_end(key)
+
+            while self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __delitem__(self: object, key: object):
+        with self._lock:
+            del self._data[key]
+
+    def __contains__(self: object, key: object) -> bool:
+        try:
+            return not self._expired(self._data[key][1])
+        except KeyError:
+            return False
+
+    def __iter__(self: object):
+        with self._lock:
+            return iter([key for key, (_, expiry) in self._data.items() if not self._expired(expiry)])
+
+    def __len__(self: object) -> int:
+        return len(self._data)
+
+    def stats(self: object) -> dict:
+        """
+        Retrieves the statistics of the cache
+        :returns: Dictionary containing the hits, misses, evictions, hit rate and size
+        """
+        _lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / _lookups if _lookups else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize
+        }
+
+
+class DiskCache(MutableMapping):
+    """
+    Dictionary persisting its entries on disk, one JSON file per entry, with an optional
+    size bound (least recently used entries are evicted first). Keys are strings or (nested)
+    tuples of strings, values must be JSON serializable.
+
+    Lookups return a fresh copy of the stored value.
+    """
+
+    _SUFFIX = '.json'
+
+    def __init__(self: object, directory: str, maxsize: int = None):
+        """
+        :param directory: Directory to store the entries in; created when missing
+        :param maxsize: Maximum number of entries, unbounded when None (optional)
+        """
+        self.maxsize = maxsize
+        self._directory = directory
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Least recently used entries first, as seen by their modification time
+        _entries = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(self._SUFFIX):
+                _entries.append((entry.stat().st_mtime, entry.name))
+        self._names = OrderedDict((name, None) for _, name in sorted(_entries))
+
+    def _name(self: object, key: object) -> str:
+        return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest() + self._SUFFIX
+
+    def _path(self: object, name: str) -> str:
+        return os.path.join(self._directory, name)
+
+    def __getitem__(self: object, key: object) -> object:
+        _name = self._name(key)
+        try:
+            with open(self._path(_name), encoding='utf-8') as file:
+                _entry = json.load(file)
+        except FileNotFoundError:
+            self.misses += 1
+            raise KeyError(key)
+
+        with self._lock:
+            self._names[_name] = None
+            self._names.move_to_end(_name)
+            self.hits += 1
+
+        try:
+            os.utime(self._path(_name))
+        except FileNotFoundError:
+            pass
+
+        return _entry['value']
+
+    def __setitem__(self: object, key: object, value: object):
+        _name = self._name(key)
+        _path = self._path(_name)
+        _temporary = f'{_path}.{threading.get_ident()}.tmp'
+        with open(_temporary, 'w', encoding='utf-8') as file:
+            json.dump({'key': key, 'value': value}, file, separators=(',', ':'))
+        os.replace(_temporary, _path)
+
+        with self._lock:
+            self._names[_name] = None
+            self._names.move_to_end(_name)
+
+            while self.maxsize is not None and len(self._names) > self.maxsize:
+                _evicted, _ = self._names.popitem(last=False)
+                try:
+                    os.remove(self._path(_evicted))
+                except FileNotFoundError:
+                    pass
+                self.evictions += 1
+
+    def __delitem__(self: object, key: object):
+        _name = self._name(key)
+        with self._lock:
+            try:
+                os.remove(self._path(_name))
+            except FileNotFoundError:
+                raise KeyError(key)
+            self._names.pop(_name, None)
+
+    def __contains__(self: object, key: object) -> bool:
+        return os.path.exists(self._path(self._name(key)))
+
+    def __iter__(self: object):
+        with self._lock:
+            _names = list(self._names)
+
+        for name in _names:
+            try:
+                with open(self._path(name), encoding='utf-8') as file:
+                    _key = json.load(file)['key']
+            except FileNotFoundError:
+                continue
+
+            yield utils.tuple_key(_key)
+
+    def __len__(self: object) -> int:
+        return len(self._names)
+
+    def stats(self: object) -> dict:
+        """
+        Retrieves the statistics of the cache
+        :returns: Dictionary containing the hits, misses, evictions, hit rate and size
+        """
+        _lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / _lookups if _lookups else 0.0,
+            'size': len(self._names),
+            'maxsize': self.maxsize
+        }
+
+
+class _Call():
+    def __init__(self: object):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """
+    Collapses concurrent calls for the same key into a single call; all callers share
+    its result (or exception).
+    """
+
+    def __init__(self: object):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self: object, key: object, function: Callable) -> object:
+        """
+        Calls the function, unless a call for the same key is in flight, in which case
+        the result of that call is awaited instead.
+        :param key: Key identifying the call
+        :param function: Callable without arguments
+        :returns: Result of the (shared) call
+        """
+        with self._lock:
+            _call = self._calls.get(key)
+            _leader = _call is None
+            if _leader:
+                _call = self._calls[key] = _Call()
+
+        if not _leader:
+            _call.done.wait()
+            if _call.error is not None:
+                raise _call.error
+
+            return _call.result
+
+        try:
+            _call.result = function()
+        except BaseException as error:
+            _call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            _call.done.set()
+
+        return _call.result
@@ -18,6 +18,7 @@ from datetime import datetime
 import click
 
 from jira_history_api import jira_history
+from jira_history_api import profiling
 
 logger = logging.getLogger(__name__)
 
@@ -44,11 +45,42 @@ logger = logging.getLogger(__name__)
 @click.option('--verbose',
               is_flag=True,
               help='Increase verbosity for more logging')
-def main(username, password, server, key, date, verbose):
+@click.option('--profile',
+              is_flag=True,
+              help='Print a breakdown of the time spent on network, metadata and replay')
+@click.option('--profile-output',
+              type=click.Path(dir_okay=False, writable=True),
+              help='Write cProfile statistics (pstats) to this file; implies --profile')
+def main(username, password, server, key, date, verbose, profile, profile_output):
     logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO,
                         format='%(levelname)s: %(message)s')
 
     jira = jira_history.Jira(url=server, username=username, password=password)
-    print(jira.get_issue(key=key, date=date))
+
+    if not (profile or profile_output):
+        print(jira.get_issue(key=key, date=date))
+        return 0
+
+    profiler = profiling.Profiler()
+    profiler.attach(jira)
+
+    _cprofile = None
+    if profile_output:
+        import cProfile
+        _cprofile = cProfile.Profile()
+
+    try:
+        with profiler.measure():
+            if _cprofile:
+                _cprofile.enable()
+            _issue = jira.get_issue(key=key, date=date)
+    finally:
+        if _cprofile:
+            _cprofile.disable()
+            _cprofile.dump_stats(profile_output)
+        profiler.detach()
+
+    print(_issue)
+    click.echo(profiler.report(), err=True)
 
     return 0
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Resumable exports of reconstructed issues.
+
+Issues are written as JSON lines to the output file. After every page of search results,
+the output is flushed to disk and a line is appended to the checkpoint file (JSON lines):
+
+    {"jql": "...", "date": "2018-06-01T00:00:00"}                     <- header
+    {"offset": 50, "output_size": 123456, "keys": ["TEST-1", ...]}    <- per page
+    {"done": true}                                                    <- on completion
+
+When restarted after a crash or interrupt, the output is truncated to the last recorded
+size and the export resumes, skipping issues already exported. Unless the JQL orders the issues
+itself, they are searched in order of creation (and key), so issues created in the meantime are
+appended. As issues that stop matching the JQL in the meantime shift the later issues to lower
+offsets, the export resumes at the start of the last recorded page rather than after it. Issues
+shifting across the resumed offset by more than a page may still be missed.
+"""
+
+from datetime import datetime
+import json
+import logging
+import os
+import re
+
+from jira_history_api import utils
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointError(ValueError):
+    """Raised when a checkpoint does not belong to the requested export"""
+
+
+def _append(file: object, entry: dict):
+    file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def _ordered(jql: str) -> str:
+    """
+    Orders the issues matching the JQL by creation (and key), unless the JQL orders them itself
+    :param jql: JQL to retrieve issues with
+    :returns: JQL retrieving the issues in a stable order
+    """
+    if re.search(r'\border\s+by\b', jql, re.IGNORECASE):
+        return jql
+
+    return f'{jql} ORDER BY created ASC, key ASC'
+
+
+def _load_checkpoint(path: str, jql: str, date: object) -> dict:
+    """
+    Reads the state recorded in a checkpoint
+    :param path: Path of the checkpoint
+    :param jql: JQL of the requested export
+    :param date: Date/time of the requested export, None to accept the recorded date/time
+    :returns: Dictionary with the date/time, offset to resume at (the start of the last recorded page),
+              output size, exported keys, completion state and the size of the valid part of the checkpoint
+    """
+    _state = {'date': None, 'offset': 0, 'output_size': 0, 'keys': set(), 'done': False, 'checkpoint_size': 0}
+    _offset = 0
+
+    with open(path, 'rb') as file:
+        for number, line in enumerate(file):
+            try:
+                if not line.endswith(b'\n'):
+                    raise ValueError('Missing end of line')
+                _entry = json.loads(line)
+            except ValueError:
+                # Partially written (last) entry
+                logger.warning(f'Ignoring incomplete checkpoint entry at line {number + 1}')
+                break
+
+            _state['checkpoint_size'] += len(line)
+
+            if number == 0:
+                if _entry.get('jql') != jql or (date is not None and _entry.get('date') != utils.datetime_to_field(date)):
+                    raise CheckpointError(f'Checkpoint {path} belongs to a different export: {_entry}')
+                _state['date'] = utils.field_to_datetime(_entry['date'])
+                continue
+
+            if _entry.get('done'):
+                _state['done'] = True
+                continue
+
+            _state['offset'], _offset = _offset, _entry['offset']
+            _state['output_size'] = _entry['output_size']
+            _state['keys'].update(_entry['keys'])
+
+    return _state
+
+
+def export(jira: object, jql: str, output: str, date: object = None, checkpoint: str = None) -> int:
+    """
+    Exports the issues matching the JQL, reconstructed at the given date/time, to a file
+    containing one issue (JSON) per line. Resumes a previous, unfinished, export of the same
+    JQL and date/time when its checkpoint is present. Unless the JQL orders the issues itself,
+    they are exported in order of creation.
+    :param jira: Jira instance to retrieve and reconstruct issues with
+    :param jql: JQL to retrieve issues with
+    :param output: Path of the output file
+    :param date: Specific date/time to unwind the issues to (optional, defaults to the date/time
+                 recorded in the checkpoint when resuming and to now otherwise)
+    :param checkpoint: Path of the checkpoint file (optional, defaults to `<output>.checkpoint`)
+    :returns: Number of issues exported by this call
+    """
+    checkpoint = checkpoint or output + '.checkpoint'
+
+    _state = {'date': None, 'offset': 0, 'output_size': 0, 'keys': set(), 'done': False, 'checkpoint_size': 0}
+    if os.path.exists(checkpoint):
+        _state = _load_checkpoint(checkpoint, jql, date)
+
+    date = _state['date'] or date or datetime.now()
+    _header = {'jql': jql, 'date': utils.datetime_to_field(date)}
+
+    if _state['done']:
+        logger.info(f'Export to {output} has already been completed')
+        return 0
+
+    if _state['checkpoint_size']:
+        logger.info(f"Resuming export to {output} at offset {_state['offset']} ({len(_state['keys'])} issues exported)")
+        with open(checkpoint, 'ab') as file:
+            file.truncate(_state['checkpoint_size'])
+        with open(output, 'ab') as file:
+            file.truncate(_state['output_size'])
+    else:
+        with open(checkpoint, 'w', encoding='utf-8') as file:
+            _append(file, _header)
+        open(output, 'wb').close()
+
+    result = 0
+    with open(checkpoint, 'a', encoding='utf-8') as _checkpoint, open(output, 'ab') as _output:
+        for offset, page in jira._search_pages(_ordered(jql), start=_state['offset']):
+            issues = [issue for issue in page if issue['key'] not in _state['keys']]
+            jira._prefetch(issues)
+
+            for issue in issues:
+                _issue = jira._update_issue_at_date(issue, date)
+                if _issue:
+                    _output.write(json.dumps(_issue, separators=(',', ':')).encode('utf-8') + b'\n')
+                    result += 1
+
+            _output.flush()
+            os.fsync(_output.fileno())
+
+            _keys = [issue['key'] for issue in issues]
+            _state['keys'].update(_keys)
+            _append(_checkpoint, {'offset': offset + len(page), 'output_size': _output.tell(), 'keys': _keys})
+
+        _append(_checkpoint, {'done': True})
+
+    return result
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import logging
+
+from jira_history_api import jira_history
+
+logger = logging.getLogger(__name__)
+
+
+class FederatedJira():
+    """
+    Queries multiple Jira servers in parallel. Every server has its own Jira instance and
+    therefore its own metadata caches.
+    """
+
+    def __init__(self: object, servers: list):
+        """
+        :param servers: Keyword arguments of `Jira` (e.g. url, username and password) per server
+        """
+        self._servers = {}
+        for server in servers:
+            self._servers[server['url']] = jira_history.Jira(**server)
+
+    def __getitem__(self: object, url: str) -> object:
+        return self._servers[url]
+
+    @property
+    def servers(self: object) -> list:
+        """URLs of all federated servers"""
+        return list(self._servers)
+
+    def jql(self: object, jql: str, date: object = None, ignore_errors: bool = False, **kwargs) -> object:
+        """
+        Retrieves issues from all servers using JQL and updates them to the status of the given date/time.
+        Issues are yielded per server, as soon as that server has been processed, and are tagged with
+        the URL of their server in `origin`. Issues created after the given date/time are omitted.
+        :param jql: JQL to retrieve issue with
+        :param date: Specific date/time to unwind the issue to, now when omitted (optional)
+        :param ignore_errors: Log, instead of raise, errors of individual servers (optional)
+        :param kwargs: Additional keyword arguments for `Jira.jql`
+        :returns: Generator yielding issues reflecting the status of the specified date/time
+        """
+        date = date or datetime.now()
+        with ThreadPoolExecutor(max_workers=len(self._servers) or 1) as executor:
+            _futures = {executor.submit(jira.jql, jql, date, **kwargs): url for url, jira in self._servers.items()}
+
+            for future in as_completed(_futures):
+                _origin = _futures[future]
+                try:
+                    _issues = future.result()
+                except Exception as error:
+                    if not ignore_errors:
+                        raise
+                    logger.error(f'Could not retrieve issues from {_origin}: {error}')
+                    continue
+
+                for issue in _issues:
+                    if issue:
+                        issue['origin'] = _origin
+                        yield issue
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Local evaluation of JQL-like predicates on (reconstructed) issues, e.g.:
+
+    status = "In Review" AND (assignee = bob OR assignee IN (alice, bill)) AND NOT resolution = EMPTY
+
+Values are compared with the string representation used by the changelog, i.e. the name
+of a status, resolution, version or component and the display name or username of an user.
+As in JQL, values are compared case-insensitively and negated conditions (`!=`, `NOT IN`)
+do not match fields that are EMPTY, e.g. `assignee != bob` does not match unassigned issues.
+"""
+
+import re
+from typing import Callable
+
+_TOKEN = re.compile(r'\s*(?:(?P<symbol>!=|=|\(|\)|,)|"(?P<dquoted>(?:[^"\\]|\\.)*)"|\'(?P<squoted>(?:[^\'\\]|\\.)*)\'|(?P<word>[^\s()=!,"\']+))')
+_KEYWORDS = ('AND', 'OR', 'NOT', 'IN', 'EMPTY')
+
+
+class FilterError(ValueError):
+    """Raised when a filter expression can not be parsed"""
+
+
+class Condition():
+    """Compares the value(s) of a single field"""
+
+    def __init__(self: object, field: str, values: tuple, negate: bool = False):
+        self.field = field
+        self.values = values
+        self.negate = negate
+
+    @property
+    def fields(self: object) -> set:
+        return {self.field}
+
+    def evaluate(self: object, lookup: Callable) -> bool:
+        _values = {value.casefold() for value in lookup(self.field)}
+        if self.negate and not _values:
+            return False
+
+        _match = False
+        for value in self.values:
+            if (value is None and not _values) or (value is not None and value.casefold() in _values):
+                _match = True
+                break
+
+        return _match != self.negate
+
+
+class Not():
+    def __init__(self: object, operand: object):
+        self.operand = operand
+
+    @property
+    def fields(self: object) -> set:
+        return self.operand.fields
+
+    def evaluate(self: object, lookup: Callable) -> bool:
+        return not self.operand.evaluate(lookup)
+
+
+class And():
+    def __init__(self: object, *operands):
+        self.operands = operands
+
+    @property
+    def fields(self: object) -> set:
+        return set().union(*(operand.fields for operand in self.operands))
+
+    def evaluate(self: object, lookup: Callable) -> bool:
+        return all(operand.evaluate(lookup) for operand in self.operands)
+
+
+class Or(And):
+    def evaluate(self: object, lookup: Callable) -> bool:
+        return any(operand.evaluate(lookup) for operand in self.operands)
+
+
+def _tokenize(expression: str) -> list:
+    _tokens = []
+    _position = 0
+    expression = expression.rstrip()
+
+    while _position < len(expression):
+        _match = _TOKEN.match(expression, _position)
+        if not _match:
+            raise FilterError(f'Unexpected character at position {_position}: {expression[_position:]}')
+
+        _position = _match.end()
+        if _match.group('symbol'):
+            _tokens.append(('symbol', _match.group('symbol')))
+        elif _match.group('word') is not None:
+            _word = _match.group('word')
+            if _word.upper() in _KEYWORDS:
+                _tokens.append(('keyword', _word.upper()))
+            else:
+                _tokens.append(('value', _word))
+        else:
+            _quoted = _match.group('dquoted') if _match.group('dquoted') is not None else _match.group('squoted')
+            _tokens.append(('value', re.sub(r'\\(.)', r'\1', _quoted)))
+
+    return _tokens
+
+
+class _Parser():
+    def __init__(self: object, expression: str):
+        self._tokens = _tokenize(expression)
+        self._position = 0
+
+    def _peek(self: object) -> tuple:
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+
+        return (None, None)
+
+    def _next(self: object, *expected) -> tuple:
+        _token = self._peek()
+        if expected and _token not in expected:
+            raise FilterError(f'Expected {" or ".join(value for _, value in expected)}, got: {_token[1]}')
+
+        self._position += 1
+        return _token
+
+    def parse(self: object) -> object:
+        _expression = self._or()
+        if self._peek() != (None, None):
+            raise FilterError(f'Unexpected token: {self._peek()[1]}')
+
+        return _expression
+
+    def _or(self: object) -> object:
+        _operands = [self._and()]
+        while self._peek() == ('keyword', 'OR'):
+            self._next()
+            _operands.append(self._and())
+
+        return _operands[0] if len(_operands) == 1 else Or(*_operands)
+
+    def _and(self: object) -> object:
+        _operands = [self._not()]
+        while self._peek() == ('keyword', 'AND'):
+            self._next()
+            _operands.append(self._not())
+
+        return _operands[0] if len(_operands) == 1 else And(*_operands)
+
+    def _not(self: object) -> object:
+        if self._peek() == ('keyword', 'NOT'):
+            self._next()
+            return Not(self._not())
+
+        if self._peek() == ('symbol', '('):
+            self._next()
+            _expression = self._or()
+            self._next(('symbol', ')'))
+            return _expression
+
+        return self._condition()
+
+    def _value(self: object) -> str:
+        _kind, _value = self._next()
+        if _kind == 'value':
+            return _value
+
+        if (_kind, _value) == ('keyword', 'EMPTY'):
+            return None
+
+        raise FilterError(f'Expected value, got: {_value}')
+
+    def _condition(self: object) -> object:
+        _kind, _field = self._next()
+        if _kind != 'value':
+            raise FilterError(f'Expected field, got: {_field}')
+
+        _negate = False
+        if self._peek() == ('keyword', 'NOT'):
+            self._next()
+            _negate = True
+            self._next(('keyword', 'IN'))
+            return Condition(_field, self._list(), _negate)
+
+        if self._peek() == ('keyword', 'IN'):
+            self._next()
+            return Condition(_field, self._list(), _negate)
+
+        _operator = self._next(('symbol', '='), ('symbol', '!='))[1]
+        return Condition(_field, (self._value(),), _operator == '!=')
+
+    def _list(self: object) -> tuple:
+        self._next(('symbol', '('))
+        _values = [self._value()]
+        while self._peek() == ('symbol', ','):
+            self._next()
+            _values.append(self._value())
+        self._next(('symbol', ')'))
+
+        return tuple(_values)
+
+
+def parse(expression: str) -> object:
+    """
+    Parses a filter expression
+    :param expression: Filter expression, e.g. `status = "In Review" AND assignee = bob`
+    :returns: Predicate providing the referenced `fields` and an `evaluate(lookup)` method,
+              where `lookup` returns the list of (string) values of a field
+    """
+    return _Parser(expression).parse()
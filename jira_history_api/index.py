@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from typing import Callable
+
+from jira_history_api import utils
+
+logger = logging.getLogger(__name__)
+
+# Fields which are indexed by default
+INDEX_FIELDS = ('status', 'assignee', 'resolution', 'fixVersions', 'components')
+
+
+class _Node():
+    """
+    Node of a centered interval tree, holding the intervals that contain its center
+    """
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self: object, intervals: list):
+        """
+        :param intervals: Non-empty list of (start, end, key) tuples; end None for open-ended intervals
+        """
+        _starts = sorted(start for start, _, _ in intervals)
+        # A start as center ensures this node holds at least one interval (which is never empty)
+        self.center = _starts[len(_starts) // 2]
+
+        _left, _right, _here = [], [], []
+        for interval in intervals:
+            _start, _end, _ = interval
+            if _end is not None and _end <= self.center:
+                _left.append(interval)
+            elif _start > self.center:
+                _right.append(interval)
+            else:
+                _here.append(interval)
+
+        self.by_start = sorted(_here, key=lambda interval: interval[0])
+        self.by_end = [interval for interval in _here if interval[1] is None]
+        self.by_end += sorted((interval for interval in _here if interval[1] is not None), key=lambda interval: interval[1], reverse=True)
+        self.left = _Node(_left) if _left else None
+        self.right = _Node(_right) if _right else None
+
+
+class _IntervalTree():
+    """
+    Centered interval tree over half-open [start, end) intervals, answering stabbing queries
+    in O(log n + hits)
+    """
+
+    def __init__(self: object, intervals: list):
+        """
+        :param intervals: List of (start, end, key) tuples; end None for open-ended intervals
+        """
+        self.intervals = intervals
+        self._root = _Node(intervals) if intervals else None
+
+    def __len__(self: object) -> int:
+        return len(self.intervals)
+
+    def stab(self: object, date: object) -> set:
+        """
+        Retrieves the keys of all intervals containing the given date/time
+        :param date: Date/time to query
+        :returns: Set of keys
+        """
+        result = set()
+        _node = self._root
+        while _node is not None:
+            if date < _node.center:
+                # All intervals of the node end after the center, hence after `date`
+                for start, _, key in _node.by_start:
+                    if start > date:
+                        break
+                    result.add(key)
+                _node = _node.left
+            else:
+                # All intervals of the node start at or before the center, hence before `date`
+                for _, end, key in _node.by_end:
+                    if end is not None and end <= date:
+                        break
+                    result.add(key)
+                _node = _node.right
+
+        return result
+
+
+_EMPTY = _IntervalTree([])
+
+
+class IntervalIndex():
+    """
+    Maps (field, value) to the intervals during which issues had that value. Values are
+    stored using their changelog string representation, e.g. the status name or the display
+    name of an user.
+
+    The intervals of all issues for a single (field, value) are stored in a centered interval
+    tree, which answers point-in-time queries in logarithmic time (plus the number of matches).
+    The trees are (re)built upon the first query following the addition of intervals.
+    """
+
+    def __init__(self: object):
+        # (field, value) -> [(start, end, key)]
+        self._pending = {}
+        # (field, value) -> _IntervalTree
+        self._trees = {}
+
+    def add(self: object, key: str, field: str, value: str, start: object, end: object = None):
+        """
+        Adds a single validity interval
+        :param key: Issue key
+        :param field: ID of the field
+        :param value: (String representation of) the value of the field
+        :param start: Date/time the field got the value
+        :param end: Date/time the field lost the value, None when it still has the value
+        """
+        if end is not None and end <= start:
+            return
+
+        self._pending.setdefault((field, value), []).append((start, end, key))
+
+    def add_issue(self: object, issue: dict, resolve_field: Callable, fields: tuple = INDEX_FIELDS):
+        """
+        Adds the validity intervals of all values the given fields had during the lifetime of an issue.
+        :param issue: Issue, including changelog, reflecting its current status
+        :param resolve_field: Callable translating a changelog field name to a field ID
+        :param fields: IDs of the fields to index
+        """
+        _key = issue['key']
+        _created = utils.field_to_datetime(issue['fields']['created'])
+
+        # Per field, the currently known values and the date/time at which they were replaced
+        _active = {}
+        for field in fields:
+            _active[field] = {value: None for value in utils.field_to_strings(issue['fields'].get(field))}
+
+        for history in reversed(issue['changelog']['histories']):
+            _history_date = utils.field_to_datetime(history['created'])
+
+            for change in reversed(history['items']):
+                _values = _active.get(resolve_field(change['field']))
+                if _values is None:
+                    continue
+
+                if change.get('toString'):
+                    self.add(_key, resolve_field(change['field']), change['toString'],
+                             _history_date, _values.pop(change['toString'], None))
+
+                if change.get('fromString'):
+                    _values[change['fromString']] = _history_date
+
+        for field, values in _active.items():
+            for value, end in values.items():
+                self.add(_key, field, value, _created, end)
+
+    def _get(self: object, field: str, value: str) -> _IntervalTree:
+        if self._pending:
+            for entry, intervals in self._pending.items():
+                _tree = self._trees.get(entry, _EMPTY)
+                self._trees[entry] = _IntervalTree(_tree.intervals + intervals)
+
+            self._pending = {}
+
+        return self._trees.get((field, value), _EMPTY)
+
+    def issues(self: object, field: str, value: str, date: object) -> set:
+        """
+        Retrieves all issues for which a field had the given value at the given date/time
+        :param field: ID of the field
+        :param value: (String representation of) the value of the field
+        :param date: Date/time to query
+        :returns: Set of issue keys
+        """
+        return self._get(field, value).stab(date)
+
+    def query(self: object, date: object, **criteria) -> set:
+        """
+        Retrieves all issues matching all criteria at the given date/time, e.g.:
+            index.query(date, status='In Progress', assignee='Alice')
+        :param date: Date/time to query
+        :param criteria: Values by field ID
+        :returns: Set of issue keys
+        """
+        result = None
+        for field, value in sorted(criteria.items(), key=lambda item: len(self._get(*item))):
+            _issues = self.issues(field, value, date)
+            result = _issues if result is None else result & _issues
+            if not result:
+                break
+
+        return result or set()
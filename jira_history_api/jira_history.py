@@ -14,29 +14,166 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import copy
+import importlib
 import logging
+from typing import Callable
 
-import atlassian
-
+from jira_history_api import archive as _archive
+from jira_history_api import cache as _cache
+from jira_history_api import filters
+from jira_history_api import index as _index
+from jira_history_api import snapshots as _snapshots
 from jira_history_api import utils
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of keys and length of the key list of a single `key in (...)` search,
+# keeping the search within the result page size and request size limits of Jira
+KEYS_PER_SEARCH = 50
+KEYS_LENGTH_PER_SEARCH = 1500
+
+# Maximum number of entries and seconds to live of the in-process caches in front of a backend,
+# bounding how long changes to users, components, versions and metadata by others go unnoticed
+LOCAL_ENTRIES = 1000
+LOCAL_TTL = 300
+
+# Default maximum number of issues whose status upon creation is kept; every status shares the
+# (complete) field values of the retrieved issue
+BASELINE_ENTRIES = 1000
+
 
 class Jira():
 
-    def __init__(self: object, url: str, username: str, password: str):
-        self._jira = atlassian.Jira(url=url,
-                                    username=username,
-                                    password=password)
+    def __init__(self: object, url: str, username: str, password: str, max_workers: int = 8,
+                 cache: Callable = _cache.Cache, results: object = None, backend: object = None,
+                 baselines: object = None):
+        """
+        :param url: Jira server URL
+        :param username: Username that is able to query Jira
+        :param password: Password associated with the username
+        :param max_workers: Maximum number of concurrent requests (optional)
+        :param cache: Callable creating the (mutable mapping) caches for users, components and versions,
+                      e.g. `functools.partial(cache.Cache, maxsize=1000, ttl=3600)` (optional)
+        :param results: Mutable mapping memoizing reconstructed issues by key, date and last update,
+                        e.g. `cache.Cache(maxsize=10000)` or `cache.DiskCache(directory, maxsize=10000)` (optional)
+        :param backend: Backend (see `backends`) shared with other instances, e.g. in other processes,
+                        holding the metadata, the retrieved issues and (unless `results` is provided) the
+                        reconstructed issues; replaces the user, component and version caches, which are then
+                        only bounded in-process caches in front of the backend (optional)
+        :param baselines: Mutable mapping holding the status of issues upon creation, to wind them forward
+                          from; `cache.Cache(maxsize=BASELINE_ENTRIES)` by default (optional)
+        """
+        self._max_workers = max_workers
+        self._credentials = {'url': url, 'username': username, 'password': password}
+        self._client = None
 
         self._fields = None
         self._statuses = None
         self._resolutions = None
-        self._components = {}
-        self._users = {}
-        self._versions = {}
+        self._components = cache()
+        self._users = cache()
+        self._versions = cache()
+        self._baselines = _cache.Cache(maxsize=BASELINE_ENTRIES) if baselines is None else baselines
+        self._results = results
+        self._metadata = None
+        self._issues = None
+        self._flight = _cache.SingleFlight()
+
+        if backend is not None:
+            from jira_history_api import backends
+
+            def _local() -> object:
+                return _cache.Cache(maxsize=LOCAL_ENTRIES, ttl=LOCAL_TTL)
+
+            self._components = backends.BackendCache(backend, f'{url}:components', _local())
+            self._users = backends.BackendCache(backend, f'{url}:users', _local())
+            self._versions = backends.BackendCache(backend, f'{url}:versions', _local())
+            self._metadata = backends.BackendCache(backend, f'{url}:metadata', _local())
+            self._issues = backends.BackendCache(backend, f'{url}:issues')
+            if results is None:
+                self._results = backends.BackendCache(backend, f'{url}:results')
+
+    @property
+    def _jira(self: object) -> object:
+        """
+        The atlassian.Jira client, which is created (and the `atlassian` package imported)
+        upon first use.
+        """
+        _client = self._client
+        if _client is None:
+            _client = self._load('_client', self._create_client)
+
+        return _client
+
+    @_jira.setter
+    def _jira(self: object, client: object):
+        self._client = client
+
+    def _create_client(self: object) -> object:
+        import atlassian
+
+        return atlassian.Jira(**self._credentials)
+
+    def _cached(self: object, table: object, key: str, function: Callable) -> object:
+        """
+        Looks up an entry in a cache, retrieving and storing it on a miss. Concurrent misses
+        for the same entry are collapsed into a single request; for caches providing a lock
+        (see `backends.BackendCache`), also across all users of the cache.
+        :param table: Cache to look up the entry in
+        :param key: Key of the entry
+        :param function: Callable retrieving the entry
+        :returns: The (cached) entry
+        """
+        try:
+            return table[key]
+        except KeyError:
+            pass
+
+        def _fetch():
+            if key in table:
+                return table[key]
+
+            _value = function()
+            table[key] = _value
+            return _value
+
+        def _fetch_locked():
+            with table.lock(key):
+                return _fetch()
+
+        return self._flight.do((id(table), key), _fetch_locked if hasattr(table, 'lock') else _fetch)
+
+    def _shared(self: object, name: str, function: Callable) -> Callable:
+        """
+        Wraps the retrieval of a metadata table (see `_load`) such that the table is shared
+        through the backend, if any.
+        :param name: Name of the table
+        :param function: Callable retrieving the table
+        :returns: Callable retrieving the (shared) table
+        """
+        if self._metadata is None:
+            return function
+
+        return lambda: self._cached(self._metadata, name, function)
+
+    def _load(self: object, attribute: str, function: Callable) -> dict:
+        """
+        Retrieves a metadata table (e.g. all statuses) unless already available. Concurrent
+        loads are collapsed into a single request.
+        :param attribute: Name of the attribute holding the table
+        :param function: Callable retrieving the table
+        :returns: The (loaded) table
+        """
+        def _fetch():
+            if not getattr(self, attribute):
+                setattr(self, attribute, function())
+
+            return getattr(self, attribute)
+
+        return self._flight.do(attribute, _fetch)
 
     def _get_user(self: object, username: str) -> dict:
         """
@@ -47,13 +184,24 @@ class Jira():
         if not username:
             return {}
 
-        try:
-            return self._users[username]
-        except KeyError:
+        def _fetch():
             logging.debug(f"Retrieving information for user: '{username}'")
-            self._users[username] = self._jira.user(username=username)
+            return self._jira.user(username=username)
+
+        return self._cached(self._users, username, _fetch)
+
+    def cache_stats(self: object) -> dict:
+        """
+        Retrieves the statistics of the user, component, version, baseline and result caches
+        :returns: Statistics (see `cache.Cache.stats`) by cache, for caches providing statistics
+        """
+        result = {}
+        for name, table in (('users', self._users), ('components', self._components), ('versions', self._versions),
+                            ('baselines', self._baselines), ('results', self._results)):
+            if hasattr(table, 'stats'):
+                result[name] = table.stats()
 
-        return self._users[username]
+        return result
 
     def _get_fields(self: object) -> dict:
         """
@@ -80,6 +228,65 @@ class Jira():
 
         return _fields_dict
 
+    def _get_project_components(self: object, project: str) -> dict:
+        """
+        Retrieves all components of a project
+        :param project: Project key
+        :returns: Components by component ID
+        """
+        def _fetch():
+            logger.debug(f'Retrieving components for project: {project}')
+
+            _components = {}
+            for component in self._jira.get_project_components(project) or []:
+                _components[str(component['id'])] = {
+                    'self': component['self'],
+                    'id': component['id'],
+                    'name': component['name']
+                }
+
+            return _components
+
+        return self._cached(self._components, project, _fetch)
+
+    def _get_project_versions(self: object, project: str) -> dict:
+        """
+        Retrieves all versions of a project
+        :param project: Project key
+        :returns: Versions by version ID
+        """
+        def _fetch():
+            logger.debug(f'Retrieving versions for project: {project}')
+
+            _versions = {}
+            for version in self._jira.get_project_versions(project) or []:
+                _versions[str(version['id'])] = version
+
+            return _versions
+
+        return self._cached(self._versions, project, _fetch)
+
+    def _prefetch(self: object, issues: list):
+        """
+        Retrieves the versions and components of all projects associated with the provided issues
+        that have been updated, using one request per project and kind, concurrently.
+        :param issues: Issues which are about to be reconstructed
+        """
+        _projects = set()
+        for issue in issues:
+            if issue['changelog']['histories'] and 'project' in issue['fields']:
+                _projects.add(issue['fields']['project']['key'])
+
+        _requests = [(self._get_project_versions, project) for project in _projects if project not in self._versions]
+        _requests += [(self._get_project_components, project) for project in _projects if project not in self._components]
+        if not _requests:
+            return
+
+        logger.debug(f'Retrieving versions and components for projects: {", ".join(sorted(_projects))}')
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            for future in [executor.submit(function, project) for function, project in _requests]:
+                future.result()
+
     def _get_component(self: object, project: str, component_id: str) -> dict:
         """
         Retrieves the component associated with the given component ID
@@ -87,29 +294,15 @@ class Jira():
         :param component_id: Component Id associated with the version
         :return: Component when component ID is known or an empty dict otherwise
         """
-
-        if not component_id:
+        if not project or not component_id:
             return {}
 
-        if component_id not in self._components:
-            _component = self._jira.component(component_id)
-
-            if 'errorMessages' in _component:
-                logger.warning(f'Incorrect component ID: {component_id}')
-                self._components[component_id] = {}
-
-            elif project != _component['project']:
-                logger.warning(f'Incorrect project ({project}) associated with component ({_component["project"]})')
-                self._components[component_id] = {}
-
-            else:
-                self._components[component_id] = {
-                    'self': _component['self'],
-                    'id': _component['id'],
-                    'name': _component['name']
-                }
+        try:
+            return self._get_project_components(project)[str(component_id)]
+        except KeyError:
+            logger.warning(f'Unknown component ({component_id}) for project {project}')
 
-        return self._components[component_id]
+        return {}
 
     def _get_version(self: object, project: str, version_id: str) -> dict:
         """
@@ -121,15 +314,8 @@ class Jira():
         if not project or not version_id:
             return {}
 
-        if not self._versions:
-            _versions = self._jira.get_project_versions(project)
-
-            self._versions[project] = {}
-            for version in _versions:
-                self._versions[project][version['id']] = version
-
         try:
-            return self._versions[project][version_id]
+            return self._get_project_versions(project)[str(version_id)]
         except KeyError:
             logger.warning(f"Unknown version: {version_id}")
 
@@ -144,11 +330,12 @@ class Jira():
         if not resolution_id:
             return {}
 
-        if not self._resolutions:
-            self._resolutions = utils.get_from_jira_scheme(self._jira.get_all_resolutions)
+        _resolutions = self._resolutions
+        if not _resolutions:
+            _resolutions = self._load('_resolutions', self._shared('resolutions', lambda: utils.get_from_jira_scheme(self._jira.get_all_resolutions)))
 
         try:
-            return self._resolutions[resolution_id]
+            return _resolutions[resolution_id]
         except KeyError:
             logger.warning(f"Unknown resolution: {resolution_id}")
 
@@ -163,11 +350,12 @@ class Jira():
         if not status_id:
             return {}
 
-        if not self._statuses:
-            self._statuses = utils.get_from_jira_scheme(self._jira.get_all_statuses)
+        _statuses = self._statuses
+        if not _statuses:
+            _statuses = self._load('_statuses', self._shared('statuses', lambda: utils.get_from_jira_scheme(self._jira.get_all_statuses)))
 
         try:
-            return self._statuses[status_id]
+            return _statuses[status_id]
         except KeyError:
             logger.warning(f"Unknown status: {status_id}")
 
@@ -182,43 +370,46 @@ class Jira():
         if not field:
             return {}
 
-        if not self._fields:
-            self._fields = self._get_fields()
+        _fields = self._fields
+        if not _fields:
+            _fields = self._load('_fields', self._shared('fields', self._get_fields))
 
         try:
-            return self._fields[field]
+            return _fields[field]
         except KeyError:
             logger.warning(f"Unknown field: {field}")
 
         return {}
 
-    def _update_array(self: object, field: dict, update: dict, issue: dict) -> dict:
+    def _update_array(self: object, field: dict, update: dict, issue: dict, forward: bool = False) -> dict:
         """
         Update the provided issue based on the historical update of a field which is of
         type `array`
         :param field: Schema of the field to update
         :param update: History item containing the update
         :param issue: Issue to be updated
+        :param forward: Apply the update (`to`) instead of reverting it (`from`)
         :returns: Updated issue
         """
         _items = field['schema']['items']
         if _items == 'version':
-            return utils.update_array_generic(issue, update, field['id'], self._get_version)
+            return utils.update_array_generic(issue, update, field['id'], self._get_version, forward)
 
         if _items == 'component':
-            return utils.update_array_generic(issue, update, field['id'], self._get_component)
+            return utils.update_array_generic(issue, update, field['id'], self._get_component, forward)
 
         if _items == 'string':
-            return update['fromString'].split(' ')
+            return update['toString' if forward else 'fromString'].split(' ')
 
         logger.error(f"Unsupport array type: {update['field']} with schema {field}")
         return {}
 
-    def _update_field(self: object, update: dict, issue: dict) -> dict:
+    def _update_field(self: object, update: dict, issue: dict, forward: bool = False) -> dict:
         """
         Update the provided issue based on the historical update
         :param update: History item containing the update
         :param issue: Issue to be updated
+        :param forward: Apply the update (`to`) instead of reverting it (`from`)
         :returns: Updated issue
         """
         field = self._get_field(update['field'])
@@ -229,20 +420,21 @@ class Jira():
             return issue
 
         _value = None
+        _id, _string = ('to', 'toString') if forward else ('from', 'fromString')
 
         _field_type = field['schema']['type']
         if _field_type == 'string':
-            _value = update['fromString']
+            _value = update[_string]
         elif _field_type == 'status':
-            _value = self._get_status(update['from'])
+            _value = self._get_status(update[_id])
         elif _field_type == 'resolution':
-            _value = self._get_resolution(update['from'])
+            _value = self._get_resolution(update[_id])
         elif _field_type == 'user':
-            _value = self._get_user(update['from'])
+            _value = self._get_user(update[_id])
         elif _field_type == 'array':
-            _value = self._update_array(field, update, issue)
+            _value = self._update_array(field, update, issue, forward)
         elif _field_type == 'number':
-            _value = update['fromString']
+            _value = update[_string]
         else:
             logger.warning(f"Unsupported field type: {field['schema']['type']}")
             return issue
@@ -252,9 +444,38 @@ class Jira():
 
         return issue
 
+    def _baseline(self: object, issue: dict) -> dict:
+        """
+        Retrieves the fields of the provided issue upon its creation, rewinding its complete
+        history once per issue and update. Only the baseline of the last seen update of an
+        issue is kept.
+        :param issue: Issue (including changelog) reflecting its current status
+        :returns: Fields of the issue upon creation; must not be modified
+        """
+        _key = issue['key']
+        _updated = issue['fields']['updated']
+
+        _baseline = self._baselines.get(_key)
+        if _baseline is not None and _baseline['updated'] == _updated:
+            return _baseline['fields']
+
+        def _rewind():
+            _issue = utils.copy_issue(issue)
+            for history in reversed(issue['changelog']['histories']):
+                for change in history['items']:
+                    _issue = self._update_field(change, _issue)
+
+            self._baselines[_key] = {'updated': _updated, 'fields': _issue['fields']}
+            return _issue['fields']
+
+        return self._flight.do((id(self._baselines), _key, _updated), _rewind)
+
     def _update_issue_at_date(self: object, issue: dict, date: object = datetime.now()) -> dict:
         """
-        Updates the provided issue to the status of the given date/time.
+        Updates (a copy of) the provided issue to the status of the given date/time. The issue is
+        either rewound from its current status or, when that applies fewer changes, wound forward
+        from its (cached) status upon creation. The copy shares all unchanged field values with
+        the provided issue, which is left untouched.
         :param issue: Issue to update reflecting the status of the given date/time
         :param date: Specific date/time to unwind the issue to (optional)
         :returns: Updated issue
@@ -269,34 +490,505 @@ class Jira():
                            f"before issue creation ({issue['fields']['created']}")
             return {}
 
-        if not issue['changelog']['histories']:
+        _histories = issue['changelog']['histories']
+        if not _histories:
             logger.info('Issue has not been updated, returning current status')
+            return utils.copy_issue(issue)
+
+        _index = utils.bisect_histories(_histories, date)
+
+        # The status upon creation is only reused when it can be told apart from
+        # the status after a later update of the same issue
+        if _index < len(_histories) - _index and 'key' in issue and issue['fields'].get('updated'):
+            logger.debug(f'Applying {_index} updates since creation')
+            issue = dict(issue, fields=dict(self._baseline(issue)))
+            for history in _histories[:_index]:
+                for change in history['items']:
+                    issue = self._update_field(change, issue, forward=True)
+
             return issue
 
         # We iterate in reverse order to allow simple patches with having
         # to reconstruct the status upon ticket creation
-        for history in reversed(issue['changelog']['histories']):
-            _history_date = utils.field_to_datetime(history['created'])
-
-            if _history_date < date:
-                logger.debug('All updates have been applied!')
-                break
+        logger.debug(f'Reverting {len(_histories) - _index} updates')
+        issue = utils.copy_issue(issue)
+        for history in reversed(_histories[_index:]):
+            for change in history['items']:
+                issue = self._update_field(change, issue)
 
-            logger.info(f'Next history at: {_history_date}')
+        return issue
 
+    def _replay_forward(self: object, issue: dict, since: object, until: object, fields: tuple) -> dict:
+        """
+        Applies all updates of the given fields between two date/times to (a copy of) the provided issue.
+        :param issue: Issue reflecting the status of `since`
+        :param since: Date/time the provided issue reflects
+        :param until: Date/time to wind the issue forward to
+        :param fields: IDs of the fields to update
+        :returns: Updated issue
+        """
+        issue = utils.copy_issue(issue)
+        _histories = issue['changelog']['histories']
+        for history in _histories[utils.bisect_histories(_histories, since):utils.bisect_histories(_histories, until)]:
             for change in history['items']:
-                issue = self._update_field(change, issue)
+                if self._get_field(change['field']).get('id') in fields:
+                    issue = self._update_field(change, issue, forward=True)
 
         return issue
 
-    def jql(self: object, jql: str, date: object = datetime.now()) -> list:
+    def _search_pages(self: object, jql: str, fields: str = '*all', start: int = 0, expand: str = 'changelog',
+                      validate: bool = True) -> object:
+        """
+        Retrieves issues, including their changelog, from Jira using JQL, one page at a time
+        :param jql: JQL to retrieve issues with
+        :param fields: Comma separated list of fields to retrieve (optional)
+        :param start: Offset of the first issue to retrieve (optional)
+        :param expand: Entities to expand, None to omit the changelog (optional)
+        :param validate: Reject invalid JQL, e.g. referring to unknown issue keys; warn instead when False (optional)
+        :returns: Generator yielding the offset and issues of every page
+        """
+        while True:
+            if validate:
+                _result = self._jira.jql(jql=jql, fields=fields, start=start, expand=expand)
+            else:
+                # atlassian.Jira.jql does not support `validateQuery`
+                _result = self._jira.post('rest/api/2/search', data={
+                    'jql': jql,
+                    'fields': fields.split(','),
+                    'startAt': start,
+                    'expand': [expand] if expand else [],
+                    'validateQuery': 'warn'
+                })
+                for warning in _result.get('warningMessages', []):
+                    logger.info(f'Search for "{jql}": {warning}')
+
+            _issues = _result['issues']
+            if not _issues:
+                return
+
+            yield start, _issues
+
+            start += len(_issues)
+            if start >= _result.get('total', 0):
+                return
+
+    def _search(self: object, jql: str, fields: str = '*all', expand: str = 'changelog', validate: bool = True) -> list:
+        """
+        Retrieves issues, including their changelog, from Jira using JQL
+        :param jql: JQL to retrieve issues with
+        :param fields: Comma separated list of fields to retrieve (optional)
+        :param expand: Entities to expand, None to omit the changelog (optional)
+        :param validate: Reject invalid JQL, e.g. referring to unknown issue keys; warn instead when False (optional)
+        :returns: Issues reflecting their current status
+        """
+        result = []
+        for _, issues in self._search_pages(jql, fields, expand=expand, validate=validate):
+            result.extend(issues)
+
+        return result
+
+    def _jql_from_results(self: object, jql: str, date: object) -> list:
+        """
+        Retrieves issues reflecting the status of the given date/time, serving the ones that did not
+        change since they were last reconstructed from the result cache. Only the last update of every
+        matching issue is retrieved upfront; the remaining issues are retrieved by key (see `get_issues`),
+        unless shared through the backend by another instance.
+        :param jql: JQL to retrieve issues with
+        :param date: Specific date/time to unwind the issues to
+        :returns: Issues reflecting the status of the specified date/time
+        """
+        # Issues are reconstructed at, and memoized by, the exact date/time: even within a
+        # second, Jira timestamps its changes with millisecond precision
+        _date = date.isoformat()
+        _stamps = [(issue['key'], issue['fields'].get('updated')) for issue in self._search(jql, fields='updated', expand=None)]
+
+        _reconstructed = {}
+        for key, updated in _stamps:
+            if updated is None:
+                continue
+
+            try:
+                _reconstructed[key] = copy.deepcopy(self._results[(key, _date, updated)])
+            except KeyError:
+                pass
+
+        _missing = [key for key, _ in _stamps if key not in _reconstructed]
+        if not _missing:
+            return [_reconstructed[key] for key, _ in _stamps]
+
+        logger.info(f'Reconstructing {len(_missing)} of {len(_stamps)} issues')
+        _stamps_by_key = dict(_stamps)
+
+        _issues = {}
+        if self._issues is not None:
+            for key in _missing:
+                if _stamps_by_key[key] is not None:
+                    _issue = self._issues.get((key, _stamps_by_key[key]))
+                    if _issue is not None:
+                        _issues[key] = _issue
+
+        _fetched = self._fetch_issues([key for key in _missing if key not in _issues])
+        if self._issues is not None:
+            for key, issue in _fetched.items():
+                if _stamps_by_key[key] is not None:
+                    self._issues[(key, _stamps_by_key[key])] = issue
+        _issues.update(_fetched)
+
+        self._prefetch(_issues.values())
+
+        for key, issue in _issues.items():
+            _reconstructed[key] = self._update_issue_at_date(issue, date)
+            if _stamps_by_key[key] is not None:
+                self._results[(key, _date, _stamps_by_key[key])] = copy.deepcopy(_reconstructed[key])
+
+        return [_reconstructed[key] for key, _ in _stamps if key in _reconstructed]
+
+    def _jql_from_snapshots(self: object, issues: list, date: object, snapshots: object) -> list:
+        """
+        Updates issues to the status of the given date/time, starting from the most recent
+        snapshot preceding that date/time.
+        :param issues: Issues (including changelog) reflecting their current status
+        :param date: Specific date/time to unwind the issue to
+        :param snapshots: SnapshotStore containing the daily snapshots
+        :returns: Issues reflecting the status of the specified date/time
+        """
+        _day = snapshots.nearest(date)
+        _rows = snapshots.read(_day) if _day else {}
+
+        result = []
+        for issue in issues:
+            if issue['key'] not in _rows:
+                logger.debug(f"No snapshot available for {issue['key']}, replaying full history")
+                result.append(self._update_issue_at_date(issue, date))
+                continue
+
+            _issue = dict(issue, fields=dict(issue['fields'], **copy.deepcopy(_rows[issue['key']])))
+            result.append(self._replay_forward(_issue, _day, date, _snapshots.SNAPSHOT_FIELDS))
+
+        return result
+
+    def _resolve_filter(self: object, where: str) -> tuple:
+        """
+        Parses a filter expression and resolves the fields it refers to
+        :param where: Filter expression (see `filters.parse`)
+        :returns: Tuple of the predicate and the referenced fields by name
+        """
+        _predicate = filters.parse(where)
+
+        _fields = {}
+        for name in _predicate.fields:
+            _fields[name] = self._get_field(name)
+            if not _fields[name]:
+                raise filters.FilterError(f'Unknown field in filter: {name}')
+
+        return _predicate, _fields
+
+    def _values_at(self: object, issue: dict, fields: list, date: object) -> dict:
+        """
+        Determines the values of the given fields at the given date/time without reconstructing
+        the issue. Single-valued fields are determined by the first update following the date/time;
+        the changelog is no longer inspected once all of those are known. Users are represented by
+        their display name followed by their username and key (see `utils.user_to_strings`).
+        :param issue: Issue (including changelog) reflecting its current status
+        :param fields: Fields (full field description) to determine the values for
+        :param date: Specific date/time to determine the values for
+        :returns: List of string representations (see `utils.field_to_strings`) by field ID
+        """
+        _pending = {}
+        _multi = {}
+        for field in fields:
+            if field['schema'].get('items') in ('version', 'component'):
+                _multi[field['id']] = []
+            else:
+                _pending[field['id']] = field
+
+        result = {}
+        _histories = issue['changelog']['histories']
+        for history in _histories[utils.bisect_histories(_histories, date):]:
+            if not _pending and not _multi:
+                break
+
+            for change in history['items']:
+                _id = self._get_field(change['field']).get('id')
+                if _id in _multi:
+                    _multi[_id].append(change)
+                elif _id in _pending:
+                    _schema = _pending.pop(_id)['schema']
+                    if _schema.get('items') == 'string':
+                        result[_id] = [value for value in (change['fromString'] or '').split(' ') if value]
+                    elif _schema['type'] == 'user':
+                        result[_id] = [value for value in dict.fromkeys((change['fromString'], change['from'])) if value]
+                    else:
+                        result[_id] = [change['fromString']] if change['fromString'] else []
+
+        for field_id, field in _pending.items():
+            if field['schema']['type'] == 'user':
+                result[field_id] = utils.user_to_strings(issue['fields'].get(field_id))
+            else:
+                result[field_id] = utils.field_to_strings(issue['fields'].get(field_id))
+
+        for field, changes in _multi.items():
+            _values = utils.field_to_strings(issue['fields'].get(field))
+            for change in reversed(changes):
+                if change['toString'] in _values:
+                    _values.remove(change['toString'])
+                if change['fromString']:
+                    _values.append(change['fromString'])
+            result[field] = _values
+
+        return result
+
+    def _matches(self: object, issue: dict, predicate: object, fields: dict, date: object) -> bool:
+        """
+        Evaluates a predicate on the status of an issue at the given date/time
+        :param issue: Issue (including changelog) reflecting its current status
+        :param predicate: Predicate to evaluate (see `filters.parse`)
+        :param fields: Fields referred to by the predicate, by name
+        :param date: Specific date/time to evaluate the predicate for
+        :returns: True when the issue existed and matched the predicate at `date`
+        """
+        if date < utils.field_to_datetime(issue['fields']['created']):
+            return False
+
+        _values = self._values_at(issue, fields.values(), date)
+        return predicate.evaluate(lambda name: _values[fields[name]['id']])
+
+    def matches(self: object, jql: str, where: str, dates: list) -> dict:
+        """
+        Evaluates a filter expression locally on the status of issues at multiple date/times,
+        using a single download of the issues matching the JQL. This avoids the expensive
+        `WAS` and `CHANGED` JQL operators.
+        :param jql: (Broad) JQL to retrieve issues with
+        :param where: Filter expression, e.g. `status = "In Review" AND assignee = bob`
+        :param dates: Date/times to evaluate the filter for
+        :returns: Keys of the matching issues by date/time
+        """
+        _predicate, _fields = self._resolve_filter(where)
+        _issues = self._search(jql, fields=','.join({'created'} | {field['id'] for field in _fields.values()}))
+
+        result = {date: [] for date in dates}
+        for issue in _issues:
+            for date in dates:
+                if self._matches(issue, _predicate, _fields, date):
+                    result[date].append(issue['key'])
+
+        return result
+
+    def materialize(self: object, jql: str, start: object, end: object, snapshots: object) -> list:
+        """
+        Reconstructs the issues matching the JQL at every day boundary between `start` and `end`
+        and stores the result as daily snapshots. Every history entry is replayed at most once.
+        Days that have not begun yet are skipped, as later changes would be missing from their snapshot.
+        :param jql: JQL to retrieve issues with
+        :param start: First day to create a snapshot for
+        :param end: Last day to create a snapshot for
+        :param snapshots: SnapshotStore to write the daily snapshots to
+        :returns: Days for which a snapshot has been written
+        """
+        _days = utils.day_range(start, min(end, datetime.now()))
+        _rows = {day: {} for day in _days}
+
+        _issues = self._search(jql)
+        self._prefetch(_issues)
+
+        for issue in _issues:
+            issue = utils.copy_issue(issue)
+            _created = utils.field_to_datetime(issue['fields']['created'])
+            _histories = issue['changelog']['histories']
+            _index = len(_histories)
+
+            for day in reversed(_days):
+                if day < _created:
+                    break
+
+                while _index and utils.field_to_datetime(_histories[_index - 1]['created']) >= day:
+                    _index -= 1
+                    for change in _histories[_index]['items']:
+                        issue = self._update_field(change, issue)
+
+                _rows[day][issue['key']] = _snapshots.snapshot_row(issue)
+
+        for day in _days:
+            snapshots.write(day, _rows[day])
+
+        return _days
+
+    def diff(self: object, jql: str, since: object, until: object = None) -> dict:
+        """
+        Retrieves the changes made to issues between two date/times, using only the part of
+        the changelog within that period. Values are represented by their changelog string
+        representation. For versions and components, `from` lists the removed and `to` lists
+        the added values; all other fields report the value at `since` and `until`.
+        :param jql: JQL to retrieve issues with
+        :param since: Start of the period (inclusive)
+        :param until: End of the period (exclusive), now when omitted (optional)
+        :returns: Dictionary of {'from': ..., 'to': ...} by field ID, by issue key
+        """
+        until = until or datetime.now()
+
+        result = {}
+        for issue in self._search(jql, fields='created'):
+            _histories = issue['changelog']['histories']
+            _start = utils.bisect_histories(_histories, since)
+            _end = utils.bisect_histories(_histories, until)
+
+            _changes = {}
+            for history in _histories[_start:_end]:
+                for change in history['items']:
+                    _field = self._get_field(change['field'])
+                    _id = _field.get('id', change['field'])
+
+                    if _field and _field['schema'].get('items') in ('version', 'component'):
+                        _change = _changes.setdefault(_id, {'from': [], 'to': []})
+                        for _removed, _added in (('from', 'to'), ('to', 'from')):
+                            _value = change[_removed + 'String']
+                            if not _value:
+                                continue
+                            if _value in _change[_added]:
+                                _change[_added].remove(_value)
+                            else:
+                                _change[_removed].append(_value)
+                    else:
+                        _changes.setdefault(_id, {'from': change['fromString']})['to'] = change['toString']
+
+            _changes = {field: change for field, change in _changes.items() if change['from'] != change['to']}
+            if _changes:
+                result[issue['key']] = _changes
+
+        return result
+
+    def _columns(self: object, jql: str, date: object, fields: list) -> dict:
+        """
+        Determines the values of the given fields at the given date/time for all issues matching
+        the JQL, column by column. Values are represented by their changelog string representation;
+        array fields by a list thereof.
+        :param jql: JQL to retrieve issues with
+        :param date: Specific date/time to determine the values for
+        :param fields: Names or IDs of the fields to determine the values for
+        :returns: List of values by field name, preceded by the issue keys (`key`)
+        """
+        _fields = {}
+        for name in fields:
+            _fields[name] = self._get_field(name)
+            if not _fields[name]:
+                raise ValueError(f'Unknown field: {name}')
+
+        _issues = self._search(jql, fields=','.join({'created'} | {field['id'] for field in _fields.values()}))
+
+        _size = len(_issues)
+        result = {'key': [None] * _size}
+        for name in _fields:
+            result[name] = [None] * _size
+
+        _row = 0
+        for issue in _issues:
+            if date < utils.field_to_datetime(issue['fields']['created']):
+                continue
+
+            _values = self._values_at(issue, _fields.values(), date)
+            result['key'][_row] = issue['key']
+            for name, field in _fields.items():
+                _value = _values[field['id']]
+                if field['schema']['type'] != 'array':
+                    _value = _value[0] if _value else None
+                result[name][_row] = _value
+            _row += 1
+
+        if _row < _size:
+            result = {name: column[:_row] for name, column in result.items()}
+
+        return result
+
+    def jql_to_frame(self: object, jql: str, date: object = None, fields: list = ('status', 'assignee'),
+                     arrow: bool = False) -> object:
+        """
+        Retrieves the values of the given fields at the given date/time for all issues matching the JQL
+        as a table, with one row per issue. Issues are not reconstructed; the values are determined from
+        the changelog directly (see `_values_at`) and represented by their changelog string representation.
+        Requires `pandas` (or `pyarrow` when `arrow` is set).
+        :param jql: JQL to retrieve issues with
+        :param date: Specific date/time to determine the values for, now when omitted (optional)
+        :param fields: Names or IDs of the fields to retrieve, which become the column names (optional)
+        :param arrow: Return a `pyarrow.Table` instead of a `pandas.DataFrame` (optional)
+        :returns: Table with a `key` column followed by one column per field
+        """
+        _module = 'pyarrow' if arrow else 'pandas'
+        try:
+            _library = importlib.import_module(_module)
+        except ImportError as error:
+            raise ImportError(f'jql_to_frame requires {_module}; install it using: pip install jira-history-api[{_module}]') from error
+
+        _columns = self._columns(jql, date or datetime.now(), fields)
+        if arrow:
+            return _library.table(_columns)
+
+        return _library.DataFrame(_columns)
+
+    def build_index(self: object, jql: str, fields: tuple = _index.INDEX_FIELDS) -> object:
+        """
+        Builds an index of the values the given fields had over time for all issues matching the JQL
+        :param jql: JQL to retrieve issues with
+        :param fields: IDs of the fields to index (optional)
+        :returns: IntervalIndex answering point-in-time membership queries
+        """
+        result = _index.IntervalIndex()
+        for issue in self._search(jql, fields=','.join(('created',) + tuple(fields))):
+            result.add_issue(issue, lambda name: self._get_field(name).get('id'), fields)
+
+        return result
+
+    def archive(self: object, jql: str, path: str) -> int:
+        """
+        Retrieves issues from Jira using JQL and stores them, including their changelog, in a
+        compact binary archive for later reconstruction (see `replay`)
+        :param jql: JQL to retrieve issues with
+        :param path: Path of the archive
+        :returns: Number of archived issues
+        """
+        return _archive.write_archive(path, self._search(jql))
+
+    def replay(self: object, issue: dict, date: object = None) -> dict:
+        """
+        Reconstructs an already retrieved (e.g. archived) issue at the given date/time. Multiple
+        date/times can be reconstructed from the same issue, as the issue itself is left untouched.
+        :param issue: Issue (including changelog) reflecting its current status
+        :param date: Specific date/time to unwind the issue to, now when omitted (optional)
+        :returns: Issue reflecting the status of the specified date/time
+        """
+        self._prefetch([issue])
+        return self._update_issue_at_date(issue, date or datetime.now())
+
+    def jql(self: object, jql: str, date: object = datetime.now(), snapshots: object = None, where: str = None) -> list:
         """
         Retrieves issues from Jira using JQL and updates them to the status of the given date/time
         :param jql: JQL to retrieve issue with
         :param date: Specific date/time to unwind the issue to (optional)
+        :param snapshots: SnapshotStore to start reconstruction from; limits the result to
+                          the snapshot fields (optional)
+        :param where: Filter expression evaluated on the status at the given date/time (optional)
         :returns: Issues reflecting the status of the specified date/time
         """
-        _issues = self._jira.jql(jql=jql, expand='changelog')['issues']
+        if self._results is not None and not snapshots and not where:
+            return self._jql_from_results(jql, date)
+
+        _fields = '*all'
+        if snapshots:
+            _fields = ','.join(('created', 'project') + _snapshots.SNAPSHOT_FIELDS)
+
+        if where:
+            _predicate, _filter_fields = self._resolve_filter(where)
+            if snapshots:
+                _fields = ','.join(set(_fields.split(',')) | {field['id'] for field in _filter_fields.values()})
+
+        _issues = self._search(jql, fields=_fields)
+
+        if where:
+            _issues = [issue for issue in _issues if self._matches(issue, _predicate, _filter_fields, date)]
+
+        self._prefetch(_issues)
+
+        if snapshots:
+            return self._jql_from_snapshots(_issues, date, snapshots)
 
         result = []
         for issue in _issues:
@@ -304,14 +996,54 @@ class Jira():
 
         return result
 
-    def get_issue(self: object, key: str, date: object = datetime.now()) -> dict:
+    def _fetch_issues(self: object, keys: list) -> dict:
+        """
+        Retrieves issues, including their changelog, by key using concurrent `key in (...)` searches.
+        Unknown keys are ignored, rather than failing the search. Like Jira, keys are case-insensitive.
+        :param keys: Unique issue keys to retrieve
+        :returns: Issues reflecting their current status by key (as spelled in `keys`), for the keys Jira returned
+        """
+        _spellings = {}
+        for key in keys:
+            _spellings.setdefault(key.upper(), []).append(key)
+
+        _chunks = utils.key_chunks(list(_spellings), KEYS_PER_SEARCH, KEYS_LENGTH_PER_SEARCH)
+        if not _chunks:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(_chunks))) as executor:
+            _searches = [executor.submit(self._search, f"key in ({','.join(chunk)})", validate=False) for chunk in _chunks]
+            return {key: issue for search in _searches for issue in search.result() for key in _spellings.get(issue['key'].upper(), [])}
+
+    def get_issues(self: object, keys: list, date: object = None) -> dict:
+        """
+        Retrieves multiple issues from Jira and updates them to the status of the given date/time.
+        The keys are combined into `key in (...)` searches, which are performed concurrently.
+        :param keys: Issue keys to retrieve
+        :param date: Specific date/time to unwind the issues to, now when omitted (optional)
+        :returns: Issues reflecting the status of the specified date/time by key; None for issues
+                  that could not be retrieved (e.g. that have been moved or deleted)
+        """
+        date = date or datetime.now()
+        result = dict.fromkeys(keys)
+        _issues = self._fetch_issues(list(result))
+        self._prefetch(_issues.values())
+
+        for key, issue in _issues.items():
+            result[key] = self._update_issue_at_date(issue, date)
+
+        return result
+
+    def get_issue(self: object, key: str, date: object = datetime.now(), snapshots: object = None) -> dict:
         """
         Retrieves an issue from Jira and updates it to the status of the given date/time
         :param key: Issue key to retrieve
         :param date: Specific date/time to unwind the issue to (optional)
+        :param snapshots: SnapshotStore to start reconstruction from; limits the result to
+                          the snapshot fields (optional)
         :returns: Issues reflecting the status of the specified date/time
         """
-        _issues = self.jql(f'key={key}', date)
+        _issues = self.jql(f'key={key}', date, snapshots)
         if len(_issues) > 0:
             return _issues[0]
 
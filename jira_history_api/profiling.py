@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter, defaultdict
+import contextlib
+import threading
+import time
+
+from jira_history_api import utils
+
+# Endpoints (atlassian.Jira methods) retrieving the issues themselves
+SEARCH_ENDPOINTS = ('jql', 'post')
+
+
+class _CountingClient():
+    """Proxy for an atlassian.Jira client recording the number of calls and time spent per endpoint"""
+
+    def __init__(self: object, client: object, profiler: object):
+        self._client = client
+        self._profiler = profiler
+
+    def __getattr__(self: object, name: str) -> object:
+        _attribute = getattr(self._client, name)
+        if not callable(_attribute):
+            return _attribute
+
+        def _call(*args, **kwargs):
+            _start = time.perf_counter()
+            try:
+                return _attribute(*args, **kwargs)
+            finally:
+                self._profiler.record_call(name, time.perf_counter() - _start)
+
+        return _call
+
+
+class Profiler():
+    """
+    Collects a per-phase wall time breakdown of a Jira instance: time spent searching,
+    retrieving metadata, parsing timestamps and replaying changes.
+    """
+
+    def __init__(self: object):
+        self.wall_time = 0.0
+        self.calls = Counter()
+        self.call_time = defaultdict(float)
+        self.strptime_calls = 0
+        self.strptime_time = 0.0
+        self.changes = 0
+
+        self._lock = threading.Lock()
+        self._jira = None
+        self._client = None
+        self._field_to_datetime = None
+
+    def record_call(self: object, endpoint: str, duration: float):
+        with self._lock:
+            self.calls[endpoint] += 1
+            self.call_time[endpoint] += duration
+
+    def attach(self: object, jira: object):
+        """
+        Instruments a Jira instance (and the timestamp parsing of the `utils` module)
+        :param jira: Jira instance to profile
+        """
+        self._jira = jira
+        self._client = jira._jira
+        jira._jira = _CountingClient(self._client, self)
+
+        _update_field = jira._update_field
+
+        def _counting_update_field(*args, **kwargs):
+            self.changes += 1
+            return _update_field(*args, **kwargs)
+
+        jira._update_field = _counting_update_field
+
+        self._field_to_datetime = utils.field_to_datetime
+
+        def _timed_field_to_datetime(field):
+            _start = time.perf_counter()
+            try:
+                return self._field_to_datetime(field)
+            finally:
+                self.strptime_calls += 1
+                self.strptime_time += time.perf_counter() - _start
+
+        utils.field_to_datetime = _timed_field_to_datetime
+
+    def detach(self: object):
+        """Removes the instrumentation added by `attach`"""
+        utils.field_to_datetime = self._field_to_datetime
+        self._jira._jira = self._client
+        del self._jira._update_field
+
+    @contextlib.contextmanager
+    def measure(self: object):
+        """Measures the wall time of the enclosed block"""
+        _start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_time += time.perf_counter() - _start
+
+    def phases(self: object) -> dict:
+        """
+        Retrieves the wall time per phase. Replay is the remaining wall time, i.e. excluding the
+        time spent on network requests and timestamp parsing.
+        :returns: Time in seconds by phase
+        """
+        _search = sum(duration for endpoint, duration in self.call_time.items() if endpoint in SEARCH_ENDPOINTS)
+        _metadata = sum(duration for endpoint, duration in self.call_time.items() if endpoint not in SEARCH_ENDPOINTS)
+
+        return {
+            'search': _search,
+            'metadata': _metadata,
+            'strptime': self.strptime_time,
+            'replay': max(self.wall_time - _search - _metadata - self.strptime_time, 0.0)
+        }
+
+    def report(self: object) -> str:
+        """
+        Formats the collected measurements
+        :returns: Human readable report
+        """
+        _lines = [f'Wall time: {self.wall_time:.3f}s']
+        for phase, duration in self.phases().items():
+            _lines.append(f'  {phase:<10} {duration:8.3f}s')
+
+        _lines.append('API calls:')
+        for endpoint, count in sorted(self.calls.items()):
+            _lines.append(f'  {endpoint:<24} {count:6d} calls {self.call_time[endpoint]:8.3f}s')
+
+        _lines.append('Cache hit rates:')
+        for name, stats in self._jira.cache_stats().items() if self._jira else ():
+            _lines.append(f"  {name:<10} {stats['hit_rate']:6.1%} ({stats['hits']} hits, {stats['misses']} misses, {stats.get('evictions', 0)} evictions)")
+
+        _replay = self.phases()['replay']
+        _rate = self.changes / _replay if _replay else 0.0
+        _lines.append(f'Timestamps parsed: {self.strptime_calls}')
+        _lines.append(f'Changes applied: {self.changes} ({_rate:.1f}/s)')
+
+        return '\n'.join(_lines)
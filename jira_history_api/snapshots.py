@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+from datetime import datetime
+import gzip
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Fields which are stored for every issue in a daily snapshot
+SNAPSHOT_FIELDS = ('status', 'assignee', 'resolution', 'fixVersions', 'components')
+
+_DAY_FORMAT = '%Y-%m-%d'
+_SUFFIX = '.json.gz'
+
+
+def snapshot_row(issue: dict) -> dict:
+    """
+    Extracts the snapshot fields of an issue. The values are shared with the issue, which
+    is fine as reconstruction replaces (rather than modifies) field values.
+    :param issue: Issue (reconstructed to the day of the snapshot)
+    :returns: Dictionary containing all snapshot fields
+    """
+    return {field: issue['fields'].get(field) for field in SNAPSHOT_FIELDS}
+
+
+class SnapshotStore():
+    """
+    Stores the state of issues at day boundaries on disk. Every day is stored in a
+    single, gzip-compressed, column-oriented JSON file:
+
+        {"day": "2018-06-01", "columns": {"key": [...], "status": [...], ...}}
+    """
+
+    def __init__(self: object, directory: str):
+        self._directory = directory
+        self._loaded = {}
+
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self: object, day: datetime) -> str:
+        return os.path.join(self._directory, day.strftime(_DAY_FORMAT) + _SUFFIX)
+
+    def days(self: object) -> list:
+        """
+        Lists all days for which a snapshot is available
+        :returns: Sorted list of days (as datetime)
+        """
+        _days = []
+        for name in os.listdir(self._directory):
+            if not name.endswith(_SUFFIX):
+                continue
+
+            try:
+                _days.append(datetime.strptime(name[:-len(_SUFFIX)], _DAY_FORMAT))
+            except ValueError:
+                logger.debug(f'Ignoring unknown file in snapshot store: {name}')
+
+        return sorted(_days)
+
+    def nearest(self: object, date: datetime) -> datetime:
+        """
+        Finds the most recent snapshot at or before the given date/time
+        :param date: Date/time to find the snapshot for
+        :returns: Day of the snapshot or None when no snapshot precedes `date`
+        """
+        _days = self.days()
+        _index = bisect.bisect_right(_days, date)
+        if not _index:
+            return None
+
+        return _days[_index - 1]
+
+    def write(self: object, day: datetime, rows: dict) -> str:
+        """
+        Writes the snapshot of a single day
+        :param day: Day the snapshot reflects
+        :param rows: Snapshot fields (see `snapshot_row`) by issue key
+        :returns: Path of the written snapshot
+        """
+        _keys = sorted(rows)
+        _columns = {'key': _keys}
+        for field in SNAPSHOT_FIELDS:
+            _columns[field] = [rows[key].get(field) for key in _keys]
+
+        _path = self._path(day)
+        with gzip.open(_path + '.tmp', 'wt', encoding='utf-8') as file:
+            json.dump({'day': day.strftime(_DAY_FORMAT), 'columns': _columns}, file, separators=(',', ':'))
+        os.replace(_path + '.tmp', _path)
+
+        self._loaded.pop(_path, None)
+        return _path
+
+    def read(self: object, day: datetime) -> dict:
+        """
+        Reads the snapshot of a single day
+        :param day: Day of the snapshot
+        :returns: Snapshot fields by issue key or an empty dict when no snapshot exists
+        """
+        _path = self._path(day)
+        if _path in self._loaded:
+            return self._loaded[_path]
+
+        try:
+            with gzip.open(_path, 'rt', encoding='utf-8') as file:
+                _columns = json.load(file)['columns']
+        except FileNotFoundError:
+            logger.warning(f'No snapshot available for {day.strftime(_DAY_FORMAT)}')
+            return {}
+
+        _rows = {}
+        for index, key in enumerate(_columns['key']):
+            _rows[key] = {field: _columns[field][index] for field in SNAPSHOT_FIELDS}
+
+        self._loaded[_path] = _rows
+        return _rows
@@ -31,6 +31,117 @@ def datetime_to_field(date):
     return date.strftime('%Y-%m-%dT%H:%M:%S')
 
 
+def copy_issue(issue: dict) -> dict:
+    """
+    Copies an issue, sharing all field values with the original. As reconstruction
+    replaces field values (rather than modifying them), the original remains untouched.
+    :param issue: Issue to copy
+    :returns: Copy of the issue with its own `fields` dictionary
+    """
+    return dict(issue, fields=dict(issue['fields']))
+
+
+def bisect_histories(histories: list, date) -> int:
+    """
+    Finds the first history created at or after the given date/time
+    :param histories: Changelog histories, sorted by creation date
+    :param date: Date/time to search for
+    :returns: Index of the first history at or after `date`, or the number of histories if there is none
+    """
+    _low, _high = 0, len(histories)
+    while _low < _high:
+        _middle = (_low + _high) // 2
+        if field_to_datetime(histories[_middle]['created']) < date:
+            _low = _middle + 1
+        else:
+            _high = _middle
+
+    return _low
+
+
+def field_to_string(value):
+    """Converts a JIRA field value to its (changelog) string representation"""
+    if value is None or isinstance(value, str):
+        return value
+
+    if isinstance(value, dict):
+        for key in ('displayName', 'name', 'value', 'key'):
+            if key in value:
+                return value[key]
+
+    return str(value)
+
+
+def user_to_strings(value):
+    """
+    Lists the display name, username and key of a JIRA user, such that a user can be matched
+    by any of them (JQL matches usernames, the changelog string representation is the display name)
+    """
+    if not value:
+        return []
+
+    if isinstance(value, str):
+        return [value]
+
+    _strings = []
+    for key in ('displayName', 'name', 'key', 'accountId'):
+        if value.get(key) and value[key] not in _strings:
+            _strings.append(value[key])
+
+    return _strings
+
+
+def field_to_strings(value):
+    """Converts a (multi-valued) JIRA field value to a list of string representations"""
+    if value is None or value == '' or value == []:
+        return []
+
+    if isinstance(value, list):
+        return [field_to_string(item) for item in value]
+
+    return [field_to_string(value)]
+
+
+def day_range(start, end):
+    """Lists all day boundaries (midnight) from `start` up to and including `end`"""
+    _day = datetime.datetime(start.year, start.month, start.day)
+    _days = []
+    while _day <= end:
+        _days.append(_day)
+        _day += datetime.timedelta(days=1)
+
+    return _days
+
+
+def tuple_key(key):
+    """Restores a (nested) tuple key stored as JSON, which represents tuples as lists"""
+    if isinstance(key, list):
+        return tuple(tuple_key(item) for item in key)
+
+    return key
+
+
+def key_chunks(keys, size, length):
+    """
+    Splits issue keys into chunks of at most `size` keys, of which the comma separated
+    list does not exceed `length` characters
+    """
+    _chunks = []
+    _chunk, _length = [], 0
+    for key in keys:
+        if _chunk and (len(_chunk) >= size or _length + 1 + len(key) > length):
+            _chunks.append(_chunk)
+            _chunk, _length = [], 0
+
+        _chunk.append(key)
+        _length += len(key) + (1 if _length else 0)
+
+    if _chunk:
+        _chunks.append(_chunk)
+
+    return _chunks
+
+
 def get_from_jira_scheme(function: Callable) -> dict:
     """
     Retrieves Jira schemes and translates them into an dict
@@ -65,14 +176,15 @@ def set_field_alias(data: dict, field: str, alias: str) -> dict:
     return data
 
 
-def update_array_generic(issue: dict, update: dict, field: str, function: Callable):
+def update_array_generic(issue: dict, update: dict, field: str, function: Callable, forward: bool = False):
     """
     Updates an array based on a function which retrieves the full
-    data type.
+    data type. The current array is left untouched.
     :param issue: the issue which will be updated
     :param update: the historical update
     :param field: schema of the field to update
     :param function: callable retrieving the full data type
+    :param forward: apply the update instead of reverting it
     """
     _current = issue['fields'][field]
     _project = issue['fields']['project']['key']
@@ -80,8 +192,10 @@ def update_array_generic(issue: dict, update: dict, field: str, function: Callab
     _from = function(_project, update['from'])
     _to = function(_project, update['to'])
 
+    if forward:
+        _from, _to = _to, _from
+
     if not _from:
         return [item for item in _current if item['id'] != _to['id']]
 
-    _current.append(_from)
-    return _current
+    return _current + [_from]
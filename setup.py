@@ -33,11 +33,15 @@ setup(
     packages=(
         'jira_history_api',
     ),
-    python_requires='>=3.5',
+    python_requires='>=3.7',
     install_requires=(
         'Click>=7,<8',
         'atlassian-python-api==1.17.2',
     ),
+    extras_require={
+        'pandas': ['pandas'],
+        'pyarrow': ['pyarrow'],
+    },
     setup_requires=(
         'setuptools_scm',
         'setuptools_scm_git_archive',
@@ -0,0 +1,113 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import tempfile
+import unittest
+
+from jira_history_api import archive
+from jira_history_api import utils
+from test.test_history import fake_jira
+
+
+def make_issue(key, status='Done'):
+    return {
+        'id': '2109604',
+        'key': key,
+        'fields': {
+            'created': '2018-01-01T12:00:00.000+0000',
+            'status': {'name': status, 'id': '2'},
+            'project': {'key': 'TEST'},
+            'labels': ['ünïcode']
+        },
+        'changelog': {
+            'histories': [
+                {
+                    'id': '2',
+                    'created': '2018-05-01T09:00:00.000+0000',
+                    'items': [{'field': 'labels', 'fieldtype': 'jira', 'fieldId': 'labels', 'from': None, 'fromString': '', 'to': None, 'toString': 'ünïcode'}]
+                },
+                {
+                    'id': '1',
+                    'author': {'name': 'bob', 'displayName': 'Bob'},
+                    'created': '2018-06-01T09:00:00.123+0200',
+                    'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'Done'}]
+                }
+            ]
+        }
+    }
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'issues.jha')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_roundtrip(self):
+        _issues = [make_issue('TEST-1'), make_issue('TEST-2', 'Open'), {'key': 'TEST-3', 'fields': {}, 'changelog': {'histories': []}}]
+        assert archive.write_archive(self.path, _issues) == 3
+
+        with archive.Archive(self.path) as uut:
+            assert len(uut) == 3
+            assert uut.keys() == ['TEST-1', 'TEST-2', 'TEST-3']
+            assert 'TEST-2' in uut
+            assert 'TEST-4' not in uut
+
+            assert uut.get_issue('TEST-2') == _issues[1]
+            assert uut.get_issue('TEST-3') == _issues[2]
+            assert uut.get_issue('TEST-1') == _issues[0]
+
+    def test_compact(self):
+        _issues = [make_issue(f'TEST-{index}') for index in range(100)]
+        archive.write_archive(self.path, _issues)
+
+        assert os.path.getsize(self.path) < len(json.dumps(_issues, separators=(',', ':')).encode('utf-8')) * 0.75
+
+    def test_invalid_archive(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'{"issues": []}')
+
+        with self.assertRaises(archive.ArchiveError):
+            archive.Archive(self.path)
+
+        open(self.path, 'wb').close()
+        with self.assertRaises(archive.ArchiveError):
+            archive.Archive(self.path)
+
+
+class TestJiraArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'issues.jha')
+
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [{'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}}]
+        self.uut._jira.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'}, {'name': 'Done', 'id': '2'}]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_archive_and_replay(self):
+        self.uut._jira.jql.return_value = {'issues': [make_issue('TEST-1')]}
+        assert self.uut.archive('project = TEST', self.path) == 1
+
+        with archive.Archive(self.path) as _archive:
+            _issue = self.uut.replay(_archive.get_issue('TEST-1'), utils.field_to_datetime('2018-06-01T08:00:00.000+0000'))
+
+        assert _issue['fields']['status']['name'] == 'Open'
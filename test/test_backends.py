@@ -0,0 +1,311 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import os
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from jira_history_api import backends
+from jira_history_api import cache
+from test.test_cache import wait_until
+from test.test_history import fake_jira
+from test.test_history import serve_searches
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough of the Redis protocol to serve the RedisBackend"""
+
+    def read_command(self):
+        _line = self.rfile.readline()
+        if not _line:
+            return None
+
+        _command = []
+        for _ in range(int(_line[1:])):
+            _length = int(self.rfile.readline()[1:])
+            _command.append(self.rfile.read(_length + 2)[:-2].decode('utf-8'))
+
+        return _command
+
+    def bulk(self, value):
+        if value is None:
+            return b'$-1\r\n'
+
+        _value = value.encode('utf-8')
+        return b'$%d\r\n%s\r\n' % (len(_value), _value)
+
+    def handle(self):
+        _data = self.server.data
+        while True:
+            _command = self.read_command()
+            if _command is None:
+                return
+
+            _name, _args = _command[0].upper(), _command[1:]
+            with self.server.lock:
+                for key in [key for key, (_, expiry) in _data.items() if expiry is not None and expiry <= time.monotonic()]:
+                    del _data[key]
+
+                if _name in ('AUTH', 'SELECT'):
+                    _reply = b'+OK\r\n'
+                elif _name == 'GET':
+                    _reply = self.bulk(_data.get(_args[0], (None, None))[0])
+                elif _name == 'SET':
+                    _options = [option.upper() for option in _args[2:]]
+                    _expiry = None
+                    if 'PX' in _options:
+                        _expiry = time.monotonic() + int(_args[2 + _options.index('PX') + 1]) / 1000
+                    if 'NX' in _options and _args[0] in _data:
+                        _reply = b'$-1\r\n'
+                    else:
+                        _data[_args[0]] = (_args[1], _expiry)
+                        _reply = b'+OK\r\n'
+                elif _name == 'DEL':
+                    _reply = b':%d\r\n' % sum(_data.pop(key, None) is not None for key in _args)
+                elif _name == 'SCAN':
+                    _prefix = _args[2][:-1].replace('\\', '')
+                    _keys = [key for key in _data if key.startswith(_prefix)]
+                    _reply = b'*2\r\n' + self.bulk('0') + b'*%d\r\n' % len(_keys) + b''.join(self.bulk(key) for key in _keys)
+                else:
+                    _reply = b'-ERR unknown command\r\n'
+
+            self.wfile.write(_reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+
+
+class BackendTests():
+    """Tests every backend has to pass"""
+
+    def test_get_set(self):
+        assert self.uut.get('a') is None
+
+        self.uut.set('a', 'value')
+        assert self.uut.get('a') == 'value'
+
+        assert self.uut.delete('a')
+        assert not self.uut.delete('a')
+        assert self.uut.get('a') is None
+
+    def test_keys(self):
+        self.uut.set('users:bob', '1')
+        self.uut.set('users:bill', '2')
+        self.uut.set('versions:TEST', '3')
+
+        assert sorted(self.uut.keys('users:')) == ['users:bill', 'users:bob']
+
+    def test_ttl(self):
+        self.uut.ttl = 0.05
+        self.uut.set('a', 'value')
+        assert self.uut.get('a') == 'value'
+
+        time.sleep(0.1)
+        assert self.uut.get('a') is None
+
+    def test_lock(self):
+        assert self.uut.acquire('lock', 'first', 60)
+        assert not self.uut.acquire('lock', 'second', 60)
+
+        self.uut.release('lock', 'second')
+        assert not self.uut.acquire('lock', 'second', 60)
+
+        self.uut.release('lock', 'first')
+        assert self.uut.acquire('lock', 'second', 60)
+
+    def test_lock_expiry(self):
+        assert self.uut.acquire('lock', 'first', 0.05)
+        time.sleep(0.1)
+        assert self.uut.acquire('lock', 'second', 60)
+
+    def test_cache(self):
+        uut = backends.BackendCache(self.uut, 'https://jira:baselines')
+        uut[('TEST-1', '2018-06-01T09:00:00.000+0000')] = {'fields': {'status': None}}
+
+        assert ('TEST-1', '2018-06-01T09:00:00.000+0000') in uut
+        assert uut[('TEST-1', '2018-06-01T09:00:00.000+0000')] == {'fields': {'status': None}}
+        assert list(uut) == [('TEST-1', '2018-06-01T09:00:00.000+0000')]
+        assert uut.get('TEST-2') is None
+        assert uut.stats() == {'hits': 1, 'local_hits': 0, 'misses': 1, 'hit_rate': 0.5}
+
+        with uut.lock('TEST-1'):
+            assert not self.uut.acquire('lock:' + uut._key('TEST-1'), 'other', 60)
+
+    def test_cache_local(self):
+        uut = backends.BackendCache(self.uut, 'https://jira:users', cache.Cache(maxsize=1))
+        uut['bob'] = {'displayName': 'Bob'}
+        self.uut.set(uut._key('bob'), '{"displayName":"Robert"}')
+
+        # Served from the local cache, as a fresh copy
+        uut['bob']['displayName'] = None
+        assert uut['bob'] == {'displayName': 'Bob'}
+
+        # Bounded; evicted entries are served from the backend again
+        uut['bill'] = {'displayName': 'Bill'}
+        assert uut['bob'] == {'displayName': 'Robert'}
+        assert uut.stats()['local_hits'] == 2
+
+        del uut['bob']
+        assert 'bob' not in uut
+
+
+class TestBackend(unittest.TestCase):
+    def test_abstract(self):
+        class PartialBackend(backends.Backend):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            backends.Backend()
+        with self.assertRaises(TypeError):
+            PartialBackend()
+
+
+class TestLocalBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.uut = backends.LocalBackend()
+
+
+class TestSQLiteBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.uut = backends.SQLiteBackend(os.path.join(self.directory.name, 'cache.sqlite'))
+
+    def tearDown(self):
+        self.uut._connection.close()
+        self.directory.cleanup()
+
+    def test_shared_database(self):
+        self.uut.set('a', 'value')
+        assert self.uut.acquire('lock', 'first', 60)
+
+        _other = backends.SQLiteBackend(os.path.join(self.directory.name, 'cache.sqlite'))
+        assert _other.get('a') == 'value'
+        assert not _other.acquire('lock', 'second', 60)
+        _other._connection.close()
+
+
+class TestRedisBackend(BackendTests, unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRedisServer()
+        threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True).start()
+        self.uut = backends.RedisBackend(*self.server.server_address, db=1, password='secret')
+
+    def tearDown(self):
+        self.uut._close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_error_reply(self):
+        with self.assertRaises(backends.BackendError):
+            self.uut.command('FLUSHALL')
+
+
+class TestJiraBackend(unittest.TestCase):
+    def setUp(self):
+        self.backend = backends.LocalBackend()
+        self.workers = [fake_jira(username='ben', password='secret', url='404', backend=self.backend) for _ in range(2)]
+
+        for worker in self.workers:
+            worker._jira.get_all_fields.return_value = [{'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}}]
+            worker._jira.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'}, {'name': 'Done', 'id': '2'}]
+            serve_searches(worker._jira, self.search)
+
+    def search(self, jql, fields, start, expand, validate):
+        _issue = {
+            'key': 'TEST-1',
+            'fields': {
+                'created': '2018-01-01T12:00:00.000+0000',
+                'updated': '2018-06-01T09:00:00.000+0000',
+                'status': {'name': 'Done', 'id': '2'},
+                'project': {'key': 'TEST'}
+            },
+            'changelog': {'histories': [{
+                'id': '1',
+                'created': '2018-06-01T09:00:00.000+0000',
+                'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'Done'}]
+            }]}
+        }
+        if expand is None:
+            return {'issues': [{'key': _issue['key'], 'fields': {'updated': _issue['fields']['updated']}}]}
+
+        return {'issues': [_issue]}
+
+    def test_shared_metadata(self):
+        assert self.workers[0]._get_status('1')['name'] == 'Open'
+        assert self.workers[1]._get_status('2')['name'] == 'Done'
+
+        self.workers[0]._jira.get_all_statuses.assert_called_once()
+        self.workers[1]._jira.get_all_statuses.assert_not_called()
+
+    def test_single_flight_across_workers(self):
+        _release = threading.Event()
+
+        def _user(username):
+            _release.wait(5)
+            return {'displayName': username}
+
+        for worker in self.workers:
+            worker._jira.user.side_effect = _user
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            _futures = [executor.submit(worker._get_user, 'bob') for worker in self.workers for _ in range(2)]
+            wait_until(lambda: any(worker._jira.user.called for worker in self.workers))
+            time.sleep(0.1)
+            _release.set()
+
+            assert all(future.result() == {'displayName': 'bob'} for future in _futures)
+
+        assert sum(worker._jira.user.call_count for worker in self.workers) == 1
+
+    def test_shared_issues(self):
+        _issues = self.workers[0].jql('project = TEST', datetime(2018, 5, 1))
+        assert _issues[0]['fields']['status']['name'] == 'Open'
+
+        # Same date/time: served from the shared results
+        assert self.workers[1].jql('project = TEST', datetime(2018, 5, 1)) == _issues
+        # Other date/time: reconstructed from the shared issue
+        assert self.workers[1].jql('project = TEST', datetime(2018, 7, 1))[0]['fields']['status']['name'] == 'Done'
+
+        assert [call[1]['expand'] for call in self.workers[1]._jira.jql.call_args_list] == [None, None]
+
+    def test_local_cache(self):
+        for worker in self.workers:
+            worker._jira.user.return_value = {'displayName': 'Bob'}
+        assert self.workers[0]._get_user('bob') == {'displayName': 'Bob'}
+
+        # Served in-process, without consulting the backend
+        with mock.patch.object(self.backend, 'get', wraps=self.backend.get) as _get:
+            assert self.workers[0]._get_user('bob') == {'displayName': 'Bob'}
+            _get.assert_not_called()
+
+            # Other instances consult the backend once
+            assert self.workers[1]._get_user('bob') == {'displayName': 'Bob'}
+            assert self.workers[1]._get_user('bob') == {'displayName': 'Bob'}
+            assert _get.call_count == 1
+
+        assert sum(worker._jira.user.call_count for worker in self.workers) == 1
+        assert self.workers[1]._users.stats()['local_hits'] == 1
@@ -0,0 +1,312 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import functools
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from jira_history_api import cache
+from test.test_history import fake_jira
+from test.test_history import search_keys
+from test.test_history import serve_searches
+
+
+def wait_until(condition, timeout=5):
+    """Polls the condition until it holds, failing the test after `timeout` seconds"""
+    _deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < _deadline, 'Timed out waiting for condition'
+        time.sleep(0.001)
+
+
+class FakeTimer():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCache(unittest.TestCase):
+    def test_unbounded(self):
+        uut = cache.Cache()
+        for index in range(100):
+            uut[index] = index
+
+        assert len(uut) == 100
+        assert uut[0] == 0
+        assert uut.stats()['evictions'] == 0
+
+    def test_lru_eviction(self):
+        uut = cache.Cache(maxsize=2)
+        uut['a'] = 1
+        uut['b'] = 2
+        assert uut['a'] == 1
+
+        uut['c'] = 3
+        assert 'a' in uut
+        assert 'b' not in uut
+        assert 'c' in uut
+        assert uut.stats()['evictions'] == 1
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        uut = cache.Cache(ttl=10, timer=timer)
+        uut['a'] = 1
+
+        timer.now = 9.9
+        assert uut['a'] == 1
+
+        timer.now = 10
+        assert 'a' not in uut
+        with self.assertRaises(KeyError):
+            uut['a']
+        assert uut.get('a') is None
+        assert uut.stats()['evictions'] == 1
+
+    def test_stats(self):
+        uut = cache.Cache(maxsize=10)
+        uut['a'] = 1
+        uut.get('a')
+        uut.get('b')
+        assert 'b' not in uut
+
+        assert uut.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'hit_rate': 0.5, 'size': 1, 'maxsize': 10}
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persistence(self):
+        uut = cache.DiskCache(self.directory.name)
+        uut[('TEST-1', '2018-06-01T00:00:00')] = {'key': 'TEST-1'}
+
+        uut = cache.DiskCache(self.directory.name)
+        assert uut[('TEST-1', '2018-06-01T00:00:00')] == {'key': 'TEST-1'}
+        assert list(uut) == [('TEST-1', '2018-06-01T00:00:00')]
+        assert len(uut) == 1
+
+        del uut[('TEST-1', '2018-06-01T00:00:00')]
+        assert ('TEST-1', '2018-06-01T00:00:00') not in uut
+        assert len(uut) == 0
+
+    def test_lru_eviction(self):
+        uut = cache.DiskCache(self.directory.name, maxsize=2)
+        uut['a'] = 1
+        uut['b'] = 2
+        assert uut['a'] == 1
+
+        uut['c'] = 3
+        assert 'a' in uut
+        assert 'b' not in uut
+        assert 'c' in uut
+        assert uut.stats() == {'hits': 1, 'misses': 0, 'evictions': 1, 'hit_rate': 1.0, 'size': 2, 'maxsize': 2}
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.uut = cache.SingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow_call(self):
+        self.calls += 1
+        self.release.wait(5)
+        return self.calls
+
+    def test_concurrent_calls(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            _futures = [executor.submit(self.uut.do, 'key', self.slow_call) for _ in range(4)]
+            wait_until(lambda: self.calls)
+            # Allow the remaining callers to join the call in flight
+            time.sleep(0.1)
+            self.release.set()
+
+            assert [future.result() for future in _futures] == [1, 1, 1, 1]
+
+        assert self.calls == 1
+
+    def test_sequential_calls(self):
+        self.release.set()
+
+        assert self.uut.do('key', self.slow_call) == 1
+        assert self.uut.do('key', self.slow_call) == 2
+
+    def test_shared_exception(self):
+        def _failing_call():
+            self.release.wait(5)
+            raise RuntimeError('failure')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            _futures = [executor.submit(self.uut.do, 'key', _failing_call) for _ in range(2)]
+            self.release.set()
+
+            for future in _futures:
+                with self.assertRaises(RuntimeError):
+                    future.result()
+
+
+class TestJiraCache(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404', cache=functools.partial(cache.Cache, maxsize=1))
+
+    def test_bounded_user_cache(self):
+        self.uut._get_user(username='bill')
+        self.uut._get_user(username='bob')
+        self.uut._get_user(username='bill')
+
+        assert self.uut._jira.user.call_count == 3
+        assert self.uut.cache_stats()['users'] == {'hits': 0, 'misses': 3, 'evictions': 2, 'hit_rate': 0.0, 'size': 1, 'maxsize': 1}
+
+    def test_plain_dict_cache(self):
+        uut = fake_jira(username='ben', password='secret', url='404', cache=dict, baselines={})
+
+        uut._get_user(username='bill')
+        uut._get_user(username='bill')
+
+        uut._jira.user.assert_called_once()
+        assert uut.cache_stats() == {}
+
+    def test_concurrent_metadata(self):
+        _release = threading.Event()
+
+        def _get_all_statuses():
+            _release.wait(5)
+            return [{'name': 'Open', 'id': '1'}]
+
+        def _user(username):
+            _release.wait(5)
+            return {'displayName': username}
+
+        self.uut._jira.get_all_statuses.side_effect = _get_all_statuses
+        self.uut._jira.user.side_effect = _user
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            _statuses = [executor.submit(self.uut._get_status, '1') for _ in range(4)]
+            _users = [executor.submit(self.uut._get_user, 'bob') for _ in range(4)]
+            wait_until(lambda: self.uut._jira.get_all_statuses.called and self.uut._jira.user.called)
+            time.sleep(0.1)
+            _release.set()
+
+            assert all(future.result()['name'] == 'Open' for future in _statuses)
+            assert all(future.result()['displayName'] == 'bob' for future in _users)
+
+        self.uut._jira.get_all_statuses.assert_called_once()
+        self.uut._jira.user.assert_called_once()
+
+
+class TestJiraResults(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404', results=cache.Cache())
+
+        self.uut._jira.get_all_fields.return_value = [{'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}}]
+        self.uut._jira.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'}, {'name': 'Done', 'id': '2'}]
+        self.updated = {'TEST-1': '2018-06-01T09:00:00.000+0000', 'TEST-2': '2018-06-01T09:00:00.000+0000'}
+        serve_searches(self.uut._jira, self.search)
+
+    def make_issue(self, key):
+        return {
+            'key': key,
+            'fields': {
+                'created': '2018-01-01T12:00:00.000+0000',
+                'updated': self.updated[key],
+                'status': {'name': 'Done', 'id': '2'},
+                'project': {'key': 'TEST'}
+            },
+            'changelog': {'histories': [{
+                'id': '1',
+                'created': self.updated[key],
+                'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'Done'}]
+            }]}
+        }
+
+    def search(self, jql, fields, start, expand, validate):
+        if jql.startswith('key in'):
+            _keys = search_keys(jql, self.updated, validate)
+        else:
+            _keys = sorted(self.updated)
+
+        if expand is None:
+            return {'issues': [{'key': key, 'fields': {'updated': self.updated[key]}} for key in _keys]}
+
+        return {'issues': [self.make_issue(key) for key in _keys]}
+
+    def test_repeated_query(self):
+        _date = datetime(2018, 5, 1, 12, 0, 0, 1)
+        _issues = self.uut.jql('project = TEST', _date)
+        assert [issue['fields']['status']['name'] for issue in _issues] == ['Open', 'Open']
+        assert self.uut._jira.jql.call_count == 1
+        assert self.uut._jira.post.call_count == 1
+
+        # Only the cheap check for updates is repeated
+        self.uut._jira.jql.reset_mock()
+        self.uut._jira.post.reset_mock()
+        _issues[0]['fields']['status'] = None
+        _issues = self.uut.jql('project = TEST', _date)
+        assert _issues == self.reconstruct('project = TEST', _date)
+        self.uut._jira.jql.assert_called_once_with(jql='project = TEST', fields='updated', start=0, expand=None)
+        self.uut._jira.post.assert_not_called()
+
+    def test_query_within_second(self):
+        # The status changed at 2018-06-01T09:00:00.000, in between both dates/times
+        _after = datetime(2018, 6, 1, 9, 0, 0, 500000)
+        _before = datetime(2018, 6, 1, 9, 0, 0)
+
+        assert self.uut.jql('project = TEST', _after) == self.reconstruct('project = TEST', _after)
+        assert self.uut.jql('project = TEST', _before) == self.reconstruct('project = TEST', _before)
+        assert [issue['fields']['status']['name'] for issue in self.uut.jql('project = TEST', _before)] == ['Open', 'Open']
+
+    def reconstruct(self, jql, date):
+        """Reconstructs the issues without result cache"""
+        _uut = fake_jira(username='ben', password='secret', url='404')
+        _uut._jira.get_all_fields.return_value = self.uut._jira.get_all_fields.return_value
+        _uut._jira.get_all_statuses.return_value = self.uut._jira.get_all_statuses.return_value
+        serve_searches(_uut._jira, self.search)
+
+        return _uut.jql(jql, date)
+
+    def test_updated_issue(self):
+        self.uut.jql('project = TEST', datetime(2018, 5, 1))
+
+        self.updated['TEST-2'] = '2018-06-02T09:00:00.000+0000'
+        self.uut._jira.jql.reset_mock()
+        _issues = self.uut.jql('project = TEST', datetime(2018, 5, 1))
+
+        assert [issue['key'] for issue in _issues] == ['TEST-1', 'TEST-2']
+        assert self.uut._jira.post.call_args[1]['data']['jql'] == 'key in (TEST-2)'
+        assert self.uut.cache_stats()['results']['hits'] == 1
+
+    def test_many_updated_issues(self):
+        self.updated.update({f'TEST-{index}': '2018-06-01T09:00:00.000+0000' for index in range(3, 8)})
+        self.uut.jql('project = TEST', datetime(2018, 5, 1))
+
+        for key in self.updated:
+            self.updated[key] = '2018-06-02T09:00:00.000+0000'
+        self.uut._jira.post.reset_mock()
+        with mock.patch('jira_history_api.jira_history.KEYS_PER_SEARCH', 3):
+            _issues = self.uut.jql('project = TEST', datetime(2018, 5, 1))
+
+        assert sorted(issue['key'] for issue in _issues) == sorted(self.updated)
+        _searches = [call[1]['data']['jql'] for call in self.uut._jira.post.call_args_list]
+        assert len(_searches) == 3
+        assert sorted(key for search in _searches for key in search[len('key in ('):-1].split(',')) == sorted(self.updated)
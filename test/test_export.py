@@ -0,0 +1,138 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from jira_history_api import export
+from test.test_history import fake_jira
+
+
+def make_issue(key):
+    return {
+        'key': key,
+        'fields': {'created': '2018-01-01T12:00:00.000+0000', 'project': {'key': 'TEST'}},
+        'changelog': {'histories': []}
+    }
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'export.jsonl')
+        self.issues = [make_issue(f'TEST-{index}') for index in range(5)]
+        self.fail_at = None
+
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.jql.side_effect = self.search
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def search(self, jql, fields, start, expand):
+        if start == self.fail_at:
+            raise ConnectionError('Network hiccup')
+
+        return {'startAt': start, 'maxResults': 2, 'total': len(self.issues), 'issues': self.issues[start:start + 2]}
+
+    def exported_keys(self):
+        with open(self.output, encoding='utf-8') as file:
+            return [json.loads(line)['key'] for line in file]
+
+    def test_export(self):
+        assert export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1)) == 5
+        assert self.exported_keys() == [f'TEST-{index}' for index in range(5)]
+        assert self.uut._jira.jql.call_count == 3
+
+    def test_resume(self):
+        self.fail_at = 4
+        with self.assertRaises(ConnectionError):
+            export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1))
+        assert self.exported_keys() == [f'TEST-{index}' for index in range(4)]
+
+        self.fail_at = None
+        self.uut._jira.jql.reset_mock()
+        assert export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1)) == 1
+        assert self.exported_keys() == [f'TEST-{index}' for index in range(5)]
+        # The last recorded page is searched again
+        assert [call[1]['start'] for call in self.uut._jira.jql.call_args_list] == [2, 4]
+
+        assert export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1)) == 0
+
+    def test_resume_after_partial_write(self):
+        self.fail_at = 2
+        with self.assertRaises(ConnectionError):
+            export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1))
+
+        with open(self.output, 'a', encoding='utf-8') as file:
+            file.write('{"key": "TEST-2", "fiel')
+        with open(self.output + '.checkpoint', 'a', encoding='utf-8') as file:
+            file.write('{"offset": 4, "output_si')
+
+        self.fail_at = None
+        assert export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1)) == 3
+        assert self.exported_keys() == [f'TEST-{index}' for index in range(5)]
+
+    def test_resume_without_date(self):
+        self.fail_at = 2
+        with self.assertRaises(ConnectionError):
+            export.export(self.uut, 'project = TEST', self.output)
+
+        with open(self.output + '.checkpoint', encoding='utf-8') as file:
+            _header = json.loads(file.readline())
+        with open(self.output + '.checkpoint', 'r+', encoding='utf-8') as file:
+            # Pretend the export started a while ago
+            _lines = file.readlines()
+            _lines[0] = json.dumps(dict(_header, date='2019-01-01T00:00:00')) + '\n'
+            file.seek(0)
+            file.writelines(_lines)
+
+        self.fail_at = None
+        with mock.patch.object(self.uut, '_update_issue_at_date', wraps=self.uut._update_issue_at_date) as _update:
+            assert export.export(self.uut, 'project = TEST', self.output) == 3
+
+        assert self.exported_keys() == [f'TEST-{index}' for index in range(5)]
+        assert {call[0][1] for call in _update.call_args_list} == {datetime(2019, 1, 1)}
+
+    def test_resume_after_issue_stopped_matching(self):
+        self.fail_at = 4
+        with self.assertRaises(ConnectionError):
+            export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1))
+
+        # TEST-4 shifts to the page already exported
+        del self.issues[1]
+        self.fail_at = None
+        assert export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1)) == 1
+        assert self.exported_keys() == [f'TEST-{index}' for index in range(5)]
+
+    def test_order(self):
+        export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1))
+        assert self.uut._jira.jql.call_args[1]['jql'] == 'project = TEST ORDER BY created ASC, key ASC'
+
+        os.remove(self.output + '.checkpoint')
+        export.export(self.uut, 'project = TEST order by updated', self.output, datetime(2019, 1, 1))
+        assert self.uut._jira.jql.call_args[1]['jql'] == 'project = TEST order by updated'
+
+    def test_different_export(self):
+        self.fail_at = 2
+        with self.assertRaises(ConnectionError):
+            export.export(self.uut, 'project = TEST', self.output, datetime(2019, 1, 1))
+
+        with self.assertRaises(export.CheckpointError):
+            export.export(self.uut, 'project = OTHER', self.output, datetime(2019, 1, 1))
@@ -0,0 +1,88 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime
+import threading
+import unittest
+
+from jira_history_api import federation
+from test.test_history import fake_jira_context
+
+
+def make_issue(key):
+    return {
+        'key': key,
+        'fields': {'created': '2018-01-01T12:00:00.000+0000', 'project': {'key': 'TEST'}},
+        'changelog': {'histories': []}
+    }
+
+
+class TestFederatedJira(unittest.TestCase):
+    def setUp(self):
+        with fake_jira_context():
+            self.uut = federation.FederatedJira([
+                {'url': 'https://legacy', 'username': 'ben', 'password': 'secret'},
+                {'url': 'https://cloud', 'username': 'ben', 'password': 'secret'}
+            ])
+            for server in self.uut.servers:
+                # The client is created on first use
+                assert self.uut[server]._jira
+
+        self.uut['https://legacy']._jira.jql.return_value = {'issues': [make_issue('OLD-1')]}
+        self.uut['https://cloud']._jira.jql.return_value = {'issues': [make_issue('NEW-1'), make_issue('NEW-2')]}
+
+    def test_servers(self):
+        assert self.uut.servers == ['https://legacy', 'https://cloud']
+        assert self.uut['https://legacy'] is not self.uut['https://cloud']
+        assert self.uut['https://legacy']._users is not self.uut['https://cloud']._users
+
+    def test_jql(self):
+        _issues = list(self.uut.jql('project = TEST', datetime(2019, 1, 1)))
+
+        assert sorted((issue['origin'], issue['key']) for issue in _issues) == [
+            ('https://cloud', 'NEW-1'),
+            ('https://cloud', 'NEW-2'),
+            ('https://legacy', 'OLD-1')
+        ]
+
+    def test_jql_leaves_issues_untouched(self):
+        _issue = make_issue('OLD-1')
+        self.uut['https://legacy']._jira.jql.return_value = {'issues': [_issue]}
+
+        list(self.uut.jql('project = TEST', datetime(2019, 1, 1)))
+        assert 'origin' not in _issue
+
+    def test_jql_before_creation(self):
+        assert list(self.uut.jql('project = TEST', datetime(2017, 1, 1))) == []
+
+    def test_jql_concurrent(self):
+        _barrier = threading.Barrier(2, timeout=5)
+
+        def _search(*_args, **_kwargs):
+            _barrier.wait()
+            return {'issues': [make_issue('ANY-1')]}
+
+        self.uut['https://legacy']._jira.jql.side_effect = _search
+        self.uut['https://cloud']._jira.jql.side_effect = _search
+
+        assert len(list(self.uut.jql('project = TEST', datetime(2019, 1, 1)))) == 2
+
+    def test_jql_errors(self):
+        self.uut['https://legacy']._jira.jql.side_effect = ConnectionError('Server unavailable')
+
+        with self.assertRaises(ConnectionError):
+            list(self.uut.jql('project = TEST', datetime(2019, 1, 1)))
+
+        _issues = list(self.uut.jql('project = TEST', datetime(2019, 1, 1), ignore_errors=True))
+        assert [issue['key'] for issue in _issues] == ['NEW-1', 'NEW-2']
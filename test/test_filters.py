@@ -0,0 +1,163 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import unittest
+
+from jira_history_api import filters
+from jira_history_api import utils
+from test.test_history import fake_jira
+
+
+class TestFilterParser(unittest.TestCase):
+    def evaluate(self, expression, **values):
+        return filters.parse(expression).evaluate(lambda field: values[field])
+
+    def test_fields(self):
+        assert filters.parse('status = Open AND (assignee = bob OR NOT labels IN (a, b))').fields == {'status', 'assignee', 'labels'}
+
+    def test_equals(self):
+        assert self.evaluate('status = "In Review"', status=['In Review'])
+        assert not self.evaluate("status = 'In Review'", status=['Open'])
+        assert self.evaluate('status != Open', status=['In Review'])
+
+    def test_empty(self):
+        assert self.evaluate('resolution = EMPTY', resolution=[])
+        assert not self.evaluate('resolution = empty', resolution=['Fixed'])
+        assert self.evaluate('resolution != EMPTY', resolution=['Fixed'])
+
+    def test_case_insensitive(self):
+        assert self.evaluate('status = "in review"', status=['In Review'])
+        assert self.evaluate('fixVersion IN (RC1, rc2)', fixVersion=['rc1'])
+        assert not self.evaluate('status != OPEN', status=['Open'])
+
+    def test_negated_empty(self):
+        # As in JQL, negated conditions do not match EMPTY fields
+        assert not self.evaluate('assignee != bob', assignee=[])
+        assert not self.evaluate('fixVersion NOT IN ("1.0", 2.0)', fixVersion=[])
+        assert not self.evaluate('resolution != EMPTY', resolution=[])
+        assert self.evaluate('NOT assignee = bob', assignee=[])
+
+    def test_in(self):
+        assert self.evaluate('fixVersion in ("1.0", 2.0)', fixVersion=['2.0', '3.0'])
+        assert not self.evaluate('fixVersion IN ("1.0", 2.0)', fixVersion=['3.0'])
+        assert self.evaluate('fixVersion NOT IN ("1.0", 2.0)', fixVersion=['3.0'])
+
+    def test_precedence(self):
+        assert self.evaluate('status = Open OR status = Done AND assignee = bob', status=['Open'], assignee=['bill'])
+        assert not self.evaluate('(status = Open OR status = Done) AND assignee = bob', status=['Open'], assignee=['bill'])
+        assert self.evaluate('NOT status = Open AND assignee = bill', status=['Done'], assignee=['bill'])
+
+    def test_invalid(self):
+        for expression in ('status', 'status = ', 'status = Open AND', '(status = Open', 'status = Open)', 'status ~ Open', 'AND = Open'):
+            with self.assertRaises(filters.FilterError):
+                filters.parse(expression)
+
+
+class TestJiraFilter(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [
+            {'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}},
+            {'id': 'assignee', 'name': 'Assignee', 'clauseNames': ['assignee'], 'schema': {'type': 'user'}},
+            {'id': 'fixVersions', 'name': 'Fix Version/s', 'clauseNames': ['fixVersion'], 'schema': {'type': 'array', 'items': 'version'}}
+        ]
+        self.uut._jira.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'},
+                                                        {'name': 'In Review', 'id': '2'}]
+        self.uut._jira.user.return_value = {'name': 'bob', 'key': 'bob', 'displayName': 'Bob Smith'}
+        self.uut._jira.get_project_versions.return_value = [{'id': '1', 'name': '1.0.0'},
+                                                            {'id': '2', 'name': '1.0.1'}]
+        self.test_issue = {
+            'key': 'TEST-100',
+            'fields': {
+                'created': '2018-06-01T12:00:00.000+0000',
+                'status': {'name': 'In Review', 'id': '2'},
+                'assignee': {'name': 'bob', 'key': 'bob', 'displayName': 'Bob Smith'},
+                'fixVersions': [{'id': '2', 'name': '1.0.1'}],
+                'project': {'key': 'TEST'}
+            },
+            'changelog': {
+                'histories': [
+                    {
+                        'id': '1',
+                        'created': '2018-06-02T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'In Review'},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': '1', 'fromString': '1.0.0', 'to': None, 'toString': None},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': None, 'fromString': None, 'to': '2', 'toString': '1.0.1'}]
+                    },
+                    {
+                        'id': '2',
+                        'created': '2018-06-03T09:00:00.000+0000',
+                        'items': [{'field': 'assignee', 'fieldtype': 'jira', 'from': 'bill', 'fromString': 'Bill Jones', 'to': 'bob', 'toString': 'Bob Smith'}]
+                    }
+                ]
+            }
+        }
+        self.before = utils.field_to_datetime('2018-06-02T08:00:00.000+0000')
+        self.between = utils.field_to_datetime('2018-06-02T10:00:00.000+0000')
+        self.after = utils.field_to_datetime('2018-06-03T10:00:00.000+0000')
+
+    def test_matches(self):
+        self.uut._jira.jql.return_value = {'issues': [self.test_issue]}
+
+        _created = utils.field_to_datetime('2018-06-01T11:00:00.000+0000')
+        assert self.uut.matches('project = TEST', 'status = "In Review" AND assignee = bob', [_created, self.before, self.between, self.after]) == {
+            _created: [],
+            self.before: [],
+            self.between: [],
+            self.after: ['TEST-100']
+        }
+        assert self.uut.matches('project = TEST', 'status = Open AND assignee = bill', [self.before, self.between]) == {
+            self.before: ['TEST-100'],
+            self.between: []
+        }
+
+    def test_matches_user(self):
+        self.uut._jira.jql.return_value = {'issues': [self.test_issue]}
+
+        # Users match by username as well as by display name
+        assert self.uut.matches('project = TEST', 'assignee = "Bill Jones"', [self.before, self.after]) == {
+            self.before: ['TEST-100'],
+            self.after: []
+        }
+        assert self.uut.matches('project = TEST', 'assignee IN (bob, "Bob Smith")', [self.before, self.after]) == {
+            self.before: [],
+            self.after: ['TEST-100']
+        }
+        assert self.uut.matches('project = TEST', 'assignee = BOB', [self.before, self.after]) == {
+            self.before: [],
+            self.after: ['TEST-100']
+        }
+
+    def test_matches_array(self):
+        self.uut._jira.jql.return_value = {'issues': [self.test_issue]}
+
+        assert self.uut.matches('project = TEST', 'fixVersion = "1.0.0"', [self.before, self.between]) == {
+            self.before: ['TEST-100'],
+            self.between: []
+        }
+
+    def test_matches_unknown_field(self):
+        with self.assertRaises(filters.FilterError):
+            self.uut.matches('project = TEST', 'unknown = value', [self.before])
+
+    def test_jql_where(self):
+        self.uut._jira.jql.return_value = {'issues': [copy.deepcopy(self.test_issue)]}
+        assert self.uut.jql('project = TEST', self.between, where='assignee = bob') == []
+
+        self.uut._jira.jql.return_value = {'issues': [copy.deepcopy(self.test_issue)]}
+        _issues = self.uut.jql('project = TEST', self.before, where='status = Open')
+        assert len(_issues) == 1
+        assert _issues[0]['fields']['status']['name'] == 'Open'
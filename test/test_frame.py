@@ -0,0 +1,86 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime
+import importlib.util
+import sys
+import unittest
+from unittest import mock
+
+from test.test_history import fake_jira
+
+
+class TestJiraFrame(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [
+            {'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}},
+            {'id': 'assignee', 'name': 'Assignee', 'clauseNames': ['assignee'], 'schema': {'type': 'user'}},
+            {'id': 'fixVersions', 'name': 'Fix Version/s', 'clauseNames': ['fixVersion'], 'schema': {'type': 'array', 'items': 'version'}}
+        ]
+        self.uut._jira.jql.return_value = {'issues': [
+            {
+                'key': 'TEST-1',
+                'fields': {
+                    'created': '2018-01-01T12:00:00.000+0000',
+                    'status': {'name': 'Done', 'id': '2'},
+                    'assignee': {'displayName': 'Bob'},
+                    'fixVersions': [{'id': '2', 'name': '1.0.1'}]
+                },
+                'changelog': {'histories': [{
+                    'id': '1',
+                    'created': '2018-06-01T09:00:00.000+0000',
+                    'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'Done'},
+                              {'field': 'Fix Version', 'fieldtype': 'jira', 'from': '1', 'fromString': '1.0.0', 'to': '2', 'toString': '1.0.1'}]
+                }]}
+            },
+            {
+                'key': 'TEST-2',
+                'fields': {'created': '2018-07-01T12:00:00.000+0000', 'status': {'name': 'Open', 'id': '1'}, 'assignee': None, 'fixVersions': []},
+                'changelog': {'histories': []}
+            }
+        ]}
+
+    def test_columns(self):
+        assert self.uut._columns('project = TEST', datetime(2018, 5, 1), ['status', 'assignee', 'fixVersion']) == {
+            'key': ['TEST-1'],
+            'status': ['Open'],
+            'assignee': ['Bob'],
+            'fixVersion': [['1.0.0']]
+        }
+
+        assert self.uut._columns('project = TEST', datetime(2018, 8, 1), ['status', 'assignee']) == {
+            'key': ['TEST-1', 'TEST-2'],
+            'status': ['Done', 'Open'],
+            'assignee': ['Bob', None]
+        }
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.uut._columns('project = TEST', datetime(2018, 8, 1), ['unknown'])
+
+    def test_missing_pandas(self):
+        with mock.patch.dict(sys.modules, {'pandas': None}):
+            with self.assertRaisesRegex(ImportError, r'jira-history-api\[pandas\]'):
+                self.uut.jql_to_frame('project = TEST', datetime(2018, 8, 1))
+
+        self.uut._jira.jql.assert_not_called()
+
+    @unittest.skipUnless(importlib.util.find_spec('pandas'), 'requires pandas')
+    def test_jql_to_frame(self):
+        _frame = self.uut.jql_to_frame('project = TEST', datetime(2018, 8, 1), ['status', 'assignee'])
+
+        assert list(_frame.columns) == ['key', 'status', 'assignee']
+        assert list(_frame['status']) == ['Done', 'Open']
@@ -14,19 +14,20 @@
 
 import atlassian
 import contextlib
+import requests
 import copy
-from datetime import datetime
+from datetime import datetime, timedelta
 import unittest
 from unittest import mock
 
+from jira_history_api import cache
 from jira_history_api import jira_history
 from jira_history_api import utils
 
 
 class TestJiraUser(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='ben', password='secret', url='404')
+        self.uut = fake_jira(username='ben', password='secret', url='404')
 
     def test_get_no_user(self):
         assert not self.uut._get_user(username=None)
@@ -53,8 +54,7 @@ class TestJiraUser(unittest.TestCase):
 
 class TestJiraField(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='bob', password='secret', url='404')
+        self.uut = fake_jira(username='bob', password='secret', url='404')
 
     def test_get_empty_fields(self):
         self.uut._jira.get_all_fields.return_value = []
@@ -114,8 +114,7 @@ class TestJiraField(unittest.TestCase):
 
 class TestJiraVersion(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='bob', password='secret', url='404')
+        self.uut = fake_jira(username='bob', password='secret', url='404')
 
     def test_get_no_version_no_project(self):
         assert not self.uut._get_version(project=None, version_id=None)
@@ -170,25 +169,21 @@ class TestJiraVersion(unittest.TestCase):
 
 class TestJiraComponent(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='bob', password='secret', url='404')
+        self.uut = fake_jira(username='bob', password='secret', url='404')
 
     def test_get_no_component_no_project(self):
         assert not self.uut._get_component(project=None, component_id=None)
-        self.uut._jira.component.assert_not_called()
+        self.uut._jira.get_project_components.assert_not_called()
 
     def test_get_no_component(self):
         assert not self.uut._get_component(project='TEST', component_id=None)
-        self.uut._jira.component.assert_not_called()
+        self.uut._jira.get_project_components.assert_not_called()
 
     def test_get_invalid_component(self):
-        self.uut._jira.component.return_value = {
-            'errorMessages': ['The component with id 666 does not exist.'],
-            'errors': {}
-        }
+        self.uut._jira.get_project_components.return_value = []
 
         assert not self.uut._get_component(project='TEST', component_id='666')
-        self.uut._jira.component.assert_called_once()
+        self.uut._jira.get_project_components.assert_called_once_with('TEST')
 
     def test_get_valid_component(self):
         _component = {
@@ -202,43 +197,59 @@ class TestJiraComponent(unittest.TestCase):
             'projectId': 22694,
             'archived': False
         }
-        self.uut._jira.component.return_value = _component
+        self.uut._jira.get_project_components.return_value = [_component]
 
         assert self.uut._get_component(project='TEST', component_id=52336) == {
             'self': _component['self'],
             'id': _component['id'],
             'name': _component['name']
         }
-        self.uut._jira.component.assert_called_once()
+        self.uut._jira.get_project_components.assert_called_once_with('TEST')
+        self.uut._jira.component.assert_not_called()
 
     def test_get_valid_component_invalid_project(self):
-        _component = {
-            'self': 'https://jira-instance/rest/api/2/component/52336',
-            'id': '52336',
-            'name': 'COMPONENT 1',
-            'assigneeType': 'PROJECT_DEFAULT',
-            'realAssigneeType': 'PROJECT_DEFAULT',
-            'isAssigneeTypeValid': False,
-            'project': 'TEST',
-            'projectId': 22694,
-            'archived': False
-        }
-        self.uut._jira.component.return_value = _component
+        self.uut._jira.get_project_components.return_value = []
 
         assert not self.uut._get_component(project='FAIL', component_id=52336)
-        self.uut._jira.component.assert_called_once()
+        self.uut._jira.get_project_components.assert_called_once_with('FAIL')
 
     def test_get_valid_component_from_cache(self):
         self.uut._get_component(project='TEST', component_id='1')
-        self.uut._get_component(project='TEST', component_id='1')
+        self.uut._get_component(project='TEST', component_id='2')
+
+        self.uut._jira.get_project_components.assert_called_once()
+
+
+class TestJiraPrefetch(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='bob', password='secret', url='404')
 
-        self.uut._jira.component.assert_called_once()
+        self.uut._jira.get_project_versions.side_effect = lambda project: [{'id': '1', 'name': f'{project} 1.0.0'}]
+        self.uut._jira.get_project_components.side_effect = lambda project: [{'self': '', 'id': '1', 'name': f'{project} component'}]
+
+    def test_prefetch(self):
+        _history = [{'id': '1', 'created': '2018-06-01T09:00:00.000+0000', 'items': []}]
+        self.uut._prefetch([
+            {'key': 'TEST-1', 'fields': {'project': {'key': 'TEST'}}, 'changelog': {'histories': _history}},
+            {'key': 'TEST-2', 'fields': {'project': {'key': 'TEST'}}, 'changelog': {'histories': _history}},
+            {'key': 'OTHER-1', 'fields': {'project': {'key': 'OTHER'}}, 'changelog': {'histories': _history}},
+            {'key': 'UNCHANGED-1', 'fields': {'project': {'key': 'UNCHANGED'}}, 'changelog': {'histories': []}}
+        ])
+
+        assert self.uut._jira.get_project_versions.call_count == 2
+        assert self.uut._jira.get_project_components.call_count == 2
+
+        assert self.uut._get_version(project='TEST', version_id='1')['name'] == 'TEST 1.0.0'
+        assert self.uut._get_version(project='OTHER', version_id='1')['name'] == 'OTHER 1.0.0'
+        assert self.uut._get_component(project='OTHER', component_id='1')['name'] == 'OTHER component'
+
+        assert self.uut._jira.get_project_versions.call_count == 2
+        assert self.uut._jira.get_project_components.call_count == 2
 
 
 class TestJiraResolution(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='ben', password='secret', url='404')
+        self.uut = fake_jira(username='ben', password='secret', url='404')
 
     def test_get_no_resolution(self):
         assert not self.uut._get_resolution(resolution_id=None)
@@ -271,8 +282,7 @@ class TestJiraResolution(unittest.TestCase):
 
 class TestJiraStatus(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='ben', password='secret', url='404')
+        self.uut = fake_jira(username='ben', password='secret', url='404')
 
     def test_get_no_status(self):
         assert not self.uut._get_status(status_id=None)
@@ -313,35 +323,34 @@ class TestJiraStatus(unittest.TestCase):
 
 class TestJiraUpdate(unittest.TestCase):
     def setUp(self):
-        with fake_jira_context():
-            self.uut = jira_history.Jira(username='ben', password='secret', url='404')
-            self.test_issue = {
-                'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields',
-                'id': '2109604',
-                'self': 'https://jira-instance/rest/api/2/issue/2109604',
-                'key': 'TEST-100',
-                'fields': {
-                    'created': '2018-01-01T12:00:00.000+0000',
-                    'fixVersions': [],
-                    'resolution': {
-                        'name': "Won't Fix",
-                        'id': '2'
-                    },
-                    'description': '*Fixed* my typo (_with_ text formatting)',
-                    'summary': 'Interesting issue to solve',
-                    'dice': '3',
-                    'status': {
-                        'name': 'Done',
-                        'id': '2'
-                    },
-                    'assignee': {'displayName': 'bill'},
-                    'project': {'key': 'TEST'},
-                    'labels': ['old_label', 'new_label']
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+        self.test_issue = {
+            'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields',
+            'id': '2109604',
+            'self': 'https://jira-instance/rest/api/2/issue/2109604',
+            'key': 'TEST-100',
+            'fields': {
+                'created': '2018-01-01T12:00:00.000+0000',
+                'fixVersions': [],
+                'resolution': {
+                    'name': "Won't Fix",
+                    'id': '2'
+                },
+                'description': '*Fixed* my typo (_with_ text formatting)',
+                'summary': 'Interesting issue to solve',
+                'dice': '3',
+                'status': {
+                    'name': 'Done',
+                    'id': '2'
                 },
-                'changelog': {
-                    'histories': []
-                }
+                'assignee': {'displayName': 'bill'},
+                'project': {'key': 'TEST'},
+                'labels': ['old_label', 'new_label']
+            },
+            'changelog': {
+                'histories': []
             }
+        }
 
     def test_update_issue_without_issue(self):
         assert not self.uut._update_issue_at_date(issue=None, date=datetime.now())
@@ -350,7 +359,10 @@ class TestJiraUpdate(unittest.TestCase):
         assert not self.uut._update_issue_at_date(issue=self.test_issue, date=None)
 
     def test_update_issue_without_changelog(self):
-        assert self.uut._update_issue_at_date(issue=self.test_issue) == self.test_issue
+        _issue = self.uut._update_issue_at_date(issue=self.test_issue)
+        assert _issue == self.test_issue
+        assert _issue is not self.test_issue
+        assert _issue['fields'] is not self.test_issue['fields']
 
     def test_update_issue_before_creation_date(self):
         assert not self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2000-01-01T09:00:00.000+0000'))
@@ -406,21 +418,46 @@ class TestJiraUpdate(unittest.TestCase):
                 'items': [{'field': 'dice', 'fieldtype': 'number', 'from': '', 'fromString': '6', 'to': '', 'toString': '3'}]
             }
         ]
-        _issue = self.uut._update_issue_at_date(issue=copy.deepcopy(self.test_issue), date=utils.field_to_datetime('2018-06-01T08:59:00.000+0000'))
+        _issue = self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2018-06-01T08:59:00.000+0000'))
         assert _issue['fields']['description'] == 'I made a typo'
         assert _issue['fields']['summary'] == 'Uninteresting issue to solve'
         assert _issue['fields']['dice'] == '6'
 
-        _issue = self.uut._update_issue_at_date(issue=copy.deepcopy(self.test_issue), date=utils.field_to_datetime('2018-11-30T09:00:00.000+0000'))
+        _issue = self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2018-11-30T09:00:00.000+0000'))
         assert _issue['fields']['description'] == 'Fixed my typo'
 
-        _issue = self.uut._update_issue_at_date(issue=copy.deepcopy(self.test_issue), date=utils.field_to_datetime('2018-12-01T12:01:00.000+0000'))
+        _issue = self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2018-12-01T12:01:00.000+0000'))
         assert _issue['fields']['description'] == '*Fixed* my typo (_with_ text formatting)'
         assert _issue['fields']['summary'] == 'Interesting issue to solve'
 
-        _issue = self.uut._update_issue_at_date(issue=copy.deepcopy(self.test_issue), date=utils.field_to_datetime('2019-01-01T15:01:00.000+0000'))
+        _issue = self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2019-01-01T15:01:00.000+0000'))
         assert _issue['fields']['dice'] == '3'
 
+    def test_update_issue_copy_on_write(self):
+        self.uut._jira.get_all_fields.return_value = [
+            {'id': 'summary', 'name': 'Summary', 'clauseNames': ['summary'], 'schema': {'type': 'string', 'system': 'summary'}},
+            {'id': 'labels', 'name': 'Labels', 'clauseNames': ['labels'], 'schema': {'type': 'array', 'items': 'string', 'system': 'labels'}}
+        ]
+        self.test_issue['changelog']['histories'] = [
+            {
+                'id': '1',
+                'created': '2018-06-01T09:00:00.000+0000',
+                'items': [{'field': 'labels', 'fieldtype': 'jira', 'from': None, 'fromString': 'old_label', 'to': None, 'toString': 'old_label new_label'}]
+            }
+        ]
+        _original = copy.deepcopy(self.test_issue)
+
+        _before = self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2018-06-01T08:59:00.000+0000'))
+        _after = self.uut._update_issue_at_date(issue=self.test_issue, date=utils.field_to_datetime('2018-06-01T09:01:00.000+0000'))
+
+        assert self.test_issue == _original
+        assert _before['fields']['labels'] == ['old_label']
+        assert _after['fields']['labels'] == ['old_label', 'new_label']
+
+        # Unchanged values are shared rather than copied
+        assert _before['fields']['assignee'] is self.test_issue['fields']['assignee']
+        assert _before['changelog'] is self.test_issue['changelog']
+
     def test_update_issue_status_field(self):
         self.uut._jira.get_all_fields.return_value = [{
             'id': 'status',
@@ -546,6 +583,227 @@ class TestJiraUpdate(unittest.TestCase):
         assert _issue['fields']['fixVersions'][0]['name'] == '1.0.0'
 
 
+class TestJiraDiff(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [
+            {'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}},
+            {'id': 'fixVersions', 'name': 'Fix Version/s', 'clauseNames': ['fixVersion'], 'schema': {'type': 'array', 'items': 'version'}}
+        ]
+        self.uut._jira.jql.return_value = {'issues': [{
+            'key': 'TEST-100',
+            'fields': {'created': '2018-01-01T12:00:00.000+0000'},
+            'changelog': {
+                'histories': [
+                    {
+                        'id': '1',
+                        'created': '2018-06-01T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'In Progress'},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': '1', 'fromString': '1.0.0', 'to': None, 'toString': None}]
+                    },
+                    {
+                        'id': '2',
+                        'created': '2018-06-02T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '2', 'fromString': 'In Progress', 'to': '3', 'toString': 'Done'},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': None, 'fromString': None, 'to': '2', 'toString': '1.0.1'}]
+                    },
+                    {
+                        'id': '3',
+                        'created': '2018-06-03T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '3', 'fromString': 'Done', 'to': '1', 'toString': 'Open'},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': None, 'fromString': None, 'to': '1', 'toString': '1.0.0'}]
+                    }
+                ]
+            }
+        }]}
+
+    def test_diff_without_changes(self):
+        assert self.uut.diff('project = TEST', datetime(2018, 5, 1), datetime(2018, 6, 1)) == {}
+
+    def test_diff(self):
+        assert self.uut.diff('project = TEST', datetime(2018, 6, 1), datetime(2018, 6, 3)) == {
+            'TEST-100': {
+                'status': {'from': 'Open', 'to': 'Done'},
+                'fixVersions': {'from': ['1.0.0'], 'to': ['1.0.1']}
+            }
+        }
+
+    def test_diff_until_now(self):
+        # Changes made after the module has been imported are included by default
+        self.uut._jira.jql.return_value['issues'][0]['changelog']['histories'].append({
+            'id': '4',
+            'created': utils.datetime_to_field(datetime.now() - timedelta(seconds=1)) + '.000+0000',
+            'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '3', 'toString': 'Done'}]
+        })
+
+        assert self.uut.diff('project = TEST', datetime(2018, 6, 4)) == {'TEST-100': {'status': {'from': 'Open', 'to': 'Done'}}}
+
+    def test_diff_reverted_changes(self):
+        assert self.uut.diff('project = TEST', datetime(2018, 6, 1), datetime(2018, 6, 4)) == {
+            'TEST-100': {
+                'fixVersions': {'from': [], 'to': ['1.0.1']}
+            }
+        }
+
+
+class TestJiraBaseline(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [{'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}}]
+        self.uut._jira.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'}, {'name': 'Done', 'id': '2'}]
+
+        _histories = []
+        for day in range(1, 11):
+            _from, _to = ('1', '2') if day % 2 else ('2', '1')
+            _histories.append({
+                'id': str(day),
+                'created': f'2018-06-{day:02}T09:00:00.000+0000',
+                'items': [{'field': 'status', 'fieldtype': 'jira', 'from': _from, 'to': _to}]
+            })
+
+        self.test_issue = {
+            'key': 'TEST-100',
+            'fields': {'created': '2018-01-01T12:00:00.000+0000', 'updated': '2018-06-10T09:00:00.000+0000', 'status': {'name': 'Open', 'id': '1'}},
+            'changelog': {'histories': _histories}
+        }
+
+    def status_at(self, issue, day):
+        return self.uut._update_issue_at_date(copy.deepcopy(issue), utils.field_to_datetime(f'2018-06-{day:02}T12:00:00.000+0000'))['fields']['status']
+
+    def test_forward_and_backward(self):
+        for day in range(1, 11):
+            assert self.status_at(self.test_issue, day)['name'] == ('Done' if day % 2 else 'Open')
+
+        assert self.uut.cache_stats()['baselines']['size'] == 1
+
+    def test_forward_applies_fewer_changes(self):
+        with mock.patch.object(self.uut, '_update_field', wraps=self.uut._update_field) as _update_field:
+            # Rewinding all changes once, followed by a single change forward
+            self.status_at(self.test_issue, 1)
+            assert _update_field.call_count == 11
+
+            _update_field.reset_mock()
+            assert self.status_at(self.test_issue, 2)['name'] == 'Open'
+            assert _update_field.call_count == 2
+            assert all(call[1] == {'forward': True} for call in _update_field.call_args_list)
+
+            _update_field.reset_mock()
+            assert self.status_at(self.test_issue, 8)['name'] == 'Open'
+            assert _update_field.call_count == 2
+            assert all(call[1] == {} for call in _update_field.call_args_list)
+
+    def test_updated_issue(self):
+        self.status_at(self.test_issue, 1)
+
+        _issue = copy.deepcopy(self.test_issue)
+        _issue['fields']['updated'] = '2018-06-11T09:00:00.000+0000'
+        _issue['fields']['status'] = {'name': 'Done', 'id': '2'}
+        _issue['changelog']['histories'].append({
+            'id': '11',
+            'created': '2018-06-11T09:00:00.000+0000',
+            'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'to': '2'}]
+        })
+
+        assert self.status_at(_issue, 2)['name'] == 'Open'
+
+        # The baseline of the previous update has been replaced
+        assert self.uut.cache_stats()['baselines']['size'] == 1
+        assert self.uut._baselines['TEST-100']['updated'] == '2018-06-11T09:00:00.000+0000'
+
+    def test_baselines_bounded(self):
+        assert self.uut._baselines.maxsize == jira_history.BASELINE_ENTRIES
+
+        self.uut._baselines = cache.Cache(maxsize=1)
+        for key in ('TEST-100', 'TEST-101'):
+            _issue = dict(self.test_issue, key=key)
+            self.status_at(_issue, 1)
+            assert self.status_at(_issue, 2)['name'] == 'Open'
+
+        assert self.uut.cache_stats()['baselines']['size'] == 1
+        assert 'TEST-101' in self.uut._baselines
+
+
+class TestJiraGetIssues(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+        serve_searches(self.uut._jira, self.search)
+
+    def search(self, jql, fields, start, expand, validate):
+        return {'issues': [{
+            'key': key,
+            'fields': {'created': '2018-01-01T12:00:00.000+0000', 'project': {'key': 'TEST'}},
+            'changelog': {'histories': []}
+        } for key in search_keys(jql, {'TEST-1', 'TEST-2', 'TEST-3'}, validate)]}
+
+    def test_get_issues(self):
+        with mock.patch.object(jira_history, 'KEYS_PER_SEARCH', 2):
+            _issues = self.uut.get_issues(['TEST-1', 'TEST-2', 'TEST-404', 'TEST-3', 'TEST-1'], datetime(2019, 1, 1))
+
+        assert list(_issues) == ['TEST-1', 'TEST-2', 'TEST-404', 'TEST-3']
+        assert _issues['TEST-404'] is None
+        assert _issues['TEST-3']['key'] == 'TEST-3'
+        assert sorted(call[1]['data']['jql'] for call in self.uut._jira.post.call_args_list) == ['key in (TEST-1,TEST-2)', 'key in (TEST-404,TEST-3)']
+
+    def test_get_issues_unknown_keys(self):
+        # A validated search fails altogether on a single unknown key
+        with self.assertRaises(requests.HTTPError):
+            self.uut.jql('key in (TEST-1,TEST-404)', datetime(2019, 1, 1))
+
+        assert self.uut.get_issues(['TEST-1', 'TEST-404'], datetime(2019, 1, 1))['TEST-1']['key'] == 'TEST-1'
+
+    def test_get_issues_case_insensitive(self):
+        _issues = self.uut.get_issues(['test-1', 'TEST-1', 'Test-2'], datetime(2019, 1, 1))
+
+        assert list(_issues) == ['test-1', 'TEST-1', 'Test-2']
+        assert [issue['key'] for issue in _issues.values()] == ['TEST-1', 'TEST-1', 'TEST-2']
+        self.uut._jira.post.assert_called_once()
+
+    def test_get_issues_without_keys(self):
+        assert self.uut.get_issues([]) == {}
+        self.uut._jira.post.assert_not_called()
+
+    def test_key_chunks(self):
+        assert utils.key_chunks([], 2, 100) == []
+        assert utils.key_chunks(['A-1', 'A-2', 'A-3'], 2, 100) == [['A-1', 'A-2'], ['A-3']]
+        assert utils.key_chunks(['A-1', 'A-2', 'A-3'], 10, 7) == [['A-1', 'A-2'], ['A-3']]
+
+
+def serve_searches(client, search):
+    """
+    Serves the searches of a fake client using `search(jql, fields, start, expand, validate)`, both
+    through atlassian.Jira.jql and through a search request (POST) with validateQuery=warn
+    """
+    client.jql.side_effect = lambda jql, fields, start, expand: search(jql, fields, start, expand, True)
+    client.post.side_effect = lambda path, data: search(
+        data['jql'], ','.join(data['fields']), data['startAt'], (data['expand'] or [None])[0], data['validateQuery'] != 'warn'
+    )
+
+
+def search_keys(jql, known, validate):
+    """
+    Lists the keys of a `key in (...)` search which are known. Like Jira, ignores the case of
+    the keys and fails the search when it refers to an unknown key, unless validation is disabled.
+    """
+    _keys = [key.upper() for key in jql[len('key in ('):-1].split(',')]
+    for key in _keys:
+        if key not in known and validate:
+            raise requests.HTTPError(f"400 Client Error: An issue with key '{key}' does not exist for field 'key'.")
+
+    return [key for key in _keys if key in known]
+
+
+def fake_jira(**kwargs):
+    """Creates a Jira instance using a fake client"""
+    with fake_jira_context():
+        jira = jira_history.Jira(**kwargs)
+        # The client is created on first use
+        assert jira._jira
+
+    return jira
+
+
 @contextlib.contextmanager
 def fake_jira_context():
 
@@ -0,0 +1,65 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+import atlassian
+
+import jira_history_api
+from jira_history_api import jira_history
+
+# Modules which should only be imported once a request is made
+HEAVY_MODULES = ('atlassian', 'requests', 'urllib3', 'cProfile')
+
+_BENCHMARK = '''
+import json, sys, time
+_start = time.perf_counter()
+import jira_history_api
+from jira_history_api import cli
+_elapsed = time.perf_counter() - _start
+try:
+    cli.main(['--help'])
+except SystemExit:
+    pass
+print(json.dumps({'elapsed': _elapsed, 'modules': sorted(name for name in %r if name in sys.modules)}))
+''' % (HEAVY_MODULES,)
+
+
+class TestImport(unittest.TestCase):
+    def test_cold_start(self):
+        _output = subprocess.run([sys.executable, '-c', _BENCHMARK], check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        _result = json.loads(_output.splitlines()[-1])
+
+        assert _result['modules'] == []
+        # Generous bound; importing `atlassian` alone takes in the order of 100ms
+        assert _result['elapsed'] < 2.0
+
+    def test_lazy_attributes(self):
+        assert jira_history_api.Jira is jira_history.Jira
+        assert jira_history_api.cli.main
+
+        with self.assertRaises(AttributeError):
+            jira_history_api.unknown
+
+    def test_deferred_client(self):
+        with mock.patch.object(atlassian, 'Jira') as client:
+            uut = jira_history.Jira(url='404', username='ben', password='secret')
+            client.assert_not_called()
+
+            assert uut._jira is uut._jira
+            client.assert_called_once_with(url='404', username='ben', password='secret')
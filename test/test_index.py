@@ -0,0 +1,121 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from datetime import datetime, timedelta
+import random
+import unittest
+
+from jira_history_api import index
+from jira_history_api import utils
+from test.test_history import fake_jira
+
+
+class TestIntervalIndex(unittest.TestCase):
+    def setUp(self):
+        self.uut = index.IntervalIndex()
+
+    def test_empty_index(self):
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 1)) == set()
+        assert self.uut.query(datetime(2018, 6, 1), status='Open') == set()
+
+    def test_intervals(self):
+        self.uut.add('TEST-1', 'status', 'Open', datetime(2018, 6, 1), datetime(2018, 6, 3))
+        self.uut.add('TEST-1', 'status', 'Open', datetime(2018, 6, 5))
+        self.uut.add('TEST-2', 'status', 'Open', datetime(2018, 6, 2), datetime(2018, 6, 4))
+
+        assert self.uut.issues('status', 'Open', datetime(2018, 5, 31)) == set()
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 1)) == {'TEST-1'}
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 2)) == {'TEST-1', 'TEST-2'}
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 3)) == {'TEST-2'}
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 4)) == set()
+        assert self.uut.issues('status', 'Open', datetime(2030, 1, 1)) == {'TEST-1'}
+
+    def test_add_after_query(self):
+        self.uut.add('TEST-1', 'status', 'Open', datetime(2018, 6, 5))
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 2)) == set()
+
+        self.uut.add('TEST-1', 'status', 'Open', datetime(2018, 6, 1), datetime(2018, 6, 3))
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 2)) == {'TEST-1'}
+        assert self.uut.issues('status', 'Open', datetime(2018, 6, 6)) == {'TEST-1'}
+
+    def test_many_issues(self):
+        _random = random.Random(42)
+        _intervals = []
+        for issue in range(500):
+            _start = datetime(2018, 1, 1)
+            for _ in range(_random.randint(1, 4)):
+                _start += timedelta(days=_random.randint(0, 60))
+                _end = None if _random.random() < 0.2 else _start + timedelta(days=_random.randint(1, 60))
+                _intervals.append((f'TEST-{issue}', _start, _end))
+                self.uut.add(f'TEST-{issue}', 'status', 'Done', _start, _end)
+                if _end is None:
+                    break
+                _start = _end
+
+        for day in range(0, 400, 7):
+            _date = datetime(2018, 1, 1) + timedelta(days=day, hours=12)
+            _expected = {key for key, start, end in _intervals if start <= _date and (end is None or _date < end)}
+            assert self.uut.issues('status', 'Done', _date) == _expected
+
+    def test_query(self):
+        self.uut.add('TEST-1', 'status', 'In Progress', datetime(2018, 6, 1))
+        self.uut.add('TEST-1', 'assignee', 'Alice', datetime(2018, 6, 2))
+        self.uut.add('TEST-2', 'status', 'In Progress', datetime(2018, 6, 1))
+        self.uut.add('TEST-2', 'assignee', 'Bob', datetime(2018, 6, 1))
+
+        assert self.uut.query(datetime(2018, 6, 1), status='In Progress', assignee='Alice') == set()
+        assert self.uut.query(datetime(2018, 6, 2), status='In Progress', assignee='Alice') == {'TEST-1'}
+        assert self.uut.query(datetime(2018, 6, 2), status='In Progress') == {'TEST-1', 'TEST-2'}
+
+
+class TestJiraIndex(unittest.TestCase):
+    def setUp(self):
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [
+            {'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}},
+            {'id': 'fixVersions', 'name': 'Fix Version/s', 'clauseNames': ['fixVersion'], 'schema': {'type': 'array', 'items': 'version'}}
+        ]
+
+    def test_build_index(self):
+        self.uut._jira.jql.return_value = {'issues': [{
+            'key': 'TEST-100',
+            'fields': {
+                'created': '2018-06-01T12:00:00.000+0000',
+                'status': {'name': 'Done', 'id': '3'},
+                'fixVersions': [{'id': '2', 'name': '1.0.1'}],
+            },
+            'changelog': {
+                'histories': [
+                    {
+                        'id': '1',
+                        'created': '2018-06-02T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '3', 'toString': 'Done'},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': '1', 'fromString': '1.0.0', 'to': None, 'toString': None},
+                                  {'field': 'Fix Version', 'fieldtype': 'jira', 'from': None, 'fromString': None, 'to': '2', 'toString': '1.0.1'}]
+                    }
+                ]
+            }
+        }]}
+
+        _index = self.uut.build_index('project=TEST', fields=('status', 'fixVersions'))
+
+        _before = utils.field_to_datetime('2018-06-02T08:59:00.000+0000')
+        _after = utils.field_to_datetime('2018-06-02T09:00:00.000+0000')
+        assert _index.issues('status', 'Open', _before) == {'TEST-100'}
+        assert _index.issues('status', 'Open', _after) == set()
+        assert _index.issues('status', 'Done', _after) == {'TEST-100'}
+        assert _index.issues('fixVersions', '1.0.0', _before) == {'TEST-100'}
+        assert _index.query(_after, status='Done', fixVersions='1.0.1') == {'TEST-100'}
+        assert _index.query(_after, status='Done', fixVersions='1.0.0') == set()
@@ -0,0 +1,111 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pstats
+import tempfile
+import unittest
+from unittest import mock
+
+import atlassian
+from click.testing import CliRunner
+
+from jira_history_api import cli
+from jira_history_api import profiling
+from jira_history_api import utils
+from test.test_history import fake_jira
+
+
+def configure_client(client):
+    client.get_all_fields.return_value = [{'id': 'status', 'name': 'Status', 'clauseNames': ['status'], 'schema': {'type': 'status'}}]
+    client.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'}, {'name': 'Done', 'id': '2'}]
+    client.jql.return_value = {'issues': [{
+        'key': 'TEST-100',
+        'fields': {'created': '2018-01-01T12:00:00.000+0000', 'status': {'name': 'Done', 'id': '2'}, 'project': {'key': 'TEST'}},
+        'changelog': {
+            'histories': [{
+                'id': '1',
+                'created': '2018-06-01T09:00:00.000+0000',
+                'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'Done'}]
+            }]
+        }
+    }]}
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.jira = fake_jira(username='ben', password='secret', url='404')
+
+        configure_client(self.jira._jira)
+        self.uut = profiling.Profiler()
+
+    def test_profile(self):
+        _client = self.jira._jira
+        _field_to_datetime = utils.field_to_datetime
+
+        self.uut.attach(self.jira)
+        with self.uut.measure():
+            _issue = self.jira.get_issue('TEST-100', utils.field_to_datetime('2018-05-01T09:00:00.000+0000'))
+        self.uut.detach()
+
+        assert _issue['fields']['status']['name'] == 'Open'
+        assert self.uut.calls == {'jql': 1, 'get_all_fields': 1, 'get_all_statuses': 1, 'get_project_versions': 1, 'get_project_components': 1}
+        assert self.uut.changes == 1
+        assert self.uut.strptime_calls >= 2
+        assert self.uut.wall_time >= sum(self.uut.phases().values()) - 1e-6
+
+        _report = self.uut.report()
+        assert 'Changes applied: 1' in _report
+        assert 'get_all_statuses' in _report
+        assert 'users' in _report
+
+        assert self.jira._jira is _client
+        assert utils.field_to_datetime is _field_to_datetime
+        assert '_update_field' not in vars(self.jira)
+
+
+class TestCliProfile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def invoke(self, *args):
+        def new_fake_client(*_args, **_kwargs):
+            _client = mock.create_autospec(atlassian.Jira, spec_set=True)()
+            configure_client(_client)
+            return _client
+
+        with mock.patch.object(atlassian, "Jira", new=new_fake_client):
+            return CliRunner(mix_stderr=False).invoke(cli.main, ['-u', 'ben', '-p', 'secret', '-s', '404', '-k', 'TEST-100', '-d', '2018-05-01'] + list(args))
+
+    def test_without_profile(self):
+        _result = self.invoke()
+        assert _result.exit_code == 0
+        assert 'Wall time' not in _result.stderr
+
+    def test_profile(self):
+        _result = self.invoke('--profile')
+        assert _result.exit_code == 0
+        assert "'name': 'Open'" in _result.stdout
+        assert 'Wall time' in _result.stderr
+
+    def test_profile_output(self):
+        _output = os.path.join(self.directory.name, 'profile.pstats')
+
+        _result = self.invoke('--profile-output', _output)
+        assert _result.exit_code == 0
+        assert 'Wall time' in _result.stderr
+        assert pstats.Stats(_output).total_calls > 0
@@ -0,0 +1,149 @@
+# Copyright (c) 2020 - 2021 TomTom N.V.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+from datetime import datetime
+from datetime import timedelta
+import tempfile
+import unittest
+from unittest import mock
+
+from jira_history_api import snapshots
+from jira_history_api import utils
+from test.test_history import fake_jira
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.uut = snapshots.SnapshotStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_no_snapshots(self):
+        assert self.uut.days() == []
+        assert self.uut.nearest(datetime(2018, 6, 1)) is None
+        assert self.uut.read(datetime(2018, 6, 1)) == {}
+
+    def test_write_read(self):
+        _row = {'status': {'name': 'Open'}, 'assignee': None, 'resolution': None, 'fixVersions': [], 'components': []}
+        self.uut.write(datetime(2018, 6, 1), {'TEST-1': _row})
+
+        assert self.uut.days() == [datetime(2018, 6, 1)]
+        assert self.uut.read(datetime(2018, 6, 1)) == {'TEST-1': _row}
+
+    def test_nearest(self):
+        self.uut.write(datetime(2018, 6, 1), {})
+        self.uut.write(datetime(2018, 6, 3), {})
+
+        assert self.uut.nearest(datetime(2018, 5, 31)) is None
+        assert self.uut.nearest(datetime(2018, 6, 1)) == datetime(2018, 6, 1)
+        assert self.uut.nearest(datetime(2018, 6, 2, 12)) == datetime(2018, 6, 1)
+        assert self.uut.nearest(datetime(2018, 7, 1)) == datetime(2018, 6, 3)
+
+
+class TestJiraSnapshots(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = snapshots.SnapshotStore(self.directory.name)
+
+        self.uut = fake_jira(username='ben', password='secret', url='404')
+
+        self.uut._jira.get_all_fields.return_value = [{
+            'id': 'status',
+            'name': 'Status',
+            'clauseNames': ['status'],
+            'schema': {'type': 'status', 'system': 'status'}
+        }]
+        self.uut._jira.get_all_statuses.return_value = [{'name': 'Open', 'id': '1'},
+                                                        {'name': 'In Progress', 'id': '2'},
+                                                        {'name': 'Done', 'id': '3'}]
+        self.test_issue = {
+            'key': 'TEST-100',
+            'fields': {
+                'created': '2018-06-01T12:00:00.000+0000',
+                'status': {'name': 'Done', 'id': '3'},
+                'project': {'key': 'TEST'}
+            },
+            'changelog': {
+                'histories': [
+                    {
+                        'id': '1',
+                        'created': '2018-06-02T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '1', 'fromString': 'Open', 'to': '2', 'toString': 'In Progress'}]
+                    },
+                    {
+                        'id': '2',
+                        'created': '2018-06-03T09:00:00.000+0000',
+                        'items': [{'field': 'status', 'fieldtype': 'jira', 'from': '2', 'fromString': 'In Progress', 'to': '3', 'toString': 'Done'}]
+                    }
+                ]
+            }
+        }
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_materialize(self):
+        self.uut._jira.jql.return_value = {'issues': [copy.deepcopy(self.test_issue)]}
+
+        assert self.uut.materialize('project=TEST', datetime(2018, 6, 1), datetime(2018, 6, 4), self.store) == utils.day_range(
+            datetime(2018, 6, 1), datetime(2018, 6, 4))
+
+        assert self.store.read(datetime(2018, 6, 1)) == {}
+        assert self.store.read(datetime(2018, 6, 2))['TEST-100']['status']['name'] == 'Open'
+        assert self.store.read(datetime(2018, 6, 3))['TEST-100']['status']['name'] == 'In Progress'
+        assert self.store.read(datetime(2018, 6, 4))['TEST-100']['status']['name'] == 'Done'
+
+    def test_materialize_future(self):
+        self.uut._jira.jql.return_value = {'issues': [copy.deepcopy(self.test_issue)]}
+
+        _today = utils.day_range(datetime.now(), datetime.now())[0]
+        assert self.uut.materialize('project=TEST', _today, _today + timedelta(days=2), self.store) == [_today]
+        assert self.store.days() == [_today]
+
+    def test_jql_from_snapshot(self):
+        self.uut._jira.jql.return_value = {'issues': [self.test_issue]}
+        self.uut.materialize('project=TEST', datetime(2018, 6, 2), datetime(2018, 6, 2), self.store)
+
+        _issue = self.uut.get_issue('TEST-100', utils.field_to_datetime('2018-06-02T08:59:00.000+0000'), snapshots=self.store)
+        assert _issue['fields']['status']['name'] == 'Open'
+
+        _issue = self.uut.get_issue('TEST-100', utils.field_to_datetime('2018-06-02T09:01:00.000+0000'), snapshots=self.store)
+        assert _issue['fields']['status']['name'] == 'In Progress'
+
+        _issue = self.uut.get_issue('TEST-100', utils.field_to_datetime('2018-06-03T09:01:00.000+0000'), snapshots=self.store)
+        assert _issue['fields']['status']['name'] == 'Done'
+        assert self.test_issue['fields']['status']['name'] == 'Done'
+
+    def test_replay_forward(self):
+        self.test_issue['changelog']['histories'][:0] = [
+            {'id': str(100 + index), 'created': f'2018-06-01T13:{index:02d}:00.000+0000', 'items': []} for index in range(60)
+        ]
+        _issue = self.uut._update_issue_at_date(self.test_issue, utils.field_to_datetime('2018-06-02T12:00:00.000+0000'))
+
+        # Only the histories within the period are applied, found without parsing every history
+        with mock.patch('jira_history_api.utils.field_to_datetime', wraps=utils.field_to_datetime) as _parse:
+            _issue = self.uut._replay_forward(_issue, utils.field_to_datetime('2018-06-02T12:00:00.000+0000'),
+                                              utils.field_to_datetime('2018-06-04T00:00:00.000+0000'), ('status',))
+            assert _parse.call_count < 20
+
+        assert _issue['fields']['status']['name'] == 'Done'
+
+    def test_jql_without_snapshot(self):
+        self.uut._jira.jql.return_value = {'issues': [copy.deepcopy(self.test_issue)]}
+
+        _issue = self.uut.get_issue('TEST-100', utils.field_to_datetime('2018-06-02T09:01:00.000+0000'), snapshots=self.store)
+        assert _issue['fields']['status']['name'] == 'In Progress'